@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# bias_test's evaluate-and-repair, N trees at a time: shapes are enumerated once as
+# postfix programs, then a batch is evaluated node by node with the repairs as masked updates
+import functools, sys, time
+import numpy as np
+from bias_test import OPS, TARGET_RANGE, NUMBER_RANGE, NUMBER_COUNT
+
+ADD, SUB, MUL, DIV, POW = (OPS.index(op) for op in ['+', '-', '*', '/', '**'])
+LIMIT = 2**62 # int64 guard, rows that would overflow are rejected
+CHUNK = 8192 # rows repaired together
+
+@functools.cache
+def shapes(n):
+    """[(probability, postfix)] where postfix is a tuple of None (leaf) or (left, right) positions."""
+    if n == 1: return [(1.0, (None,))]
+    splits = [1] if n == 2 else range(1, n)
+    out = []
+    for split in splits:
+        for pl, left in shapes(split):
+            for pr, right in shapes(n - split):
+                shift = tuple(c if c is None else (c[0] + len(left), c[1] + len(left)) for c in right)
+                root = (len(left) - 1, len(left) + len(right) - 1)
+                out.append((pl * pr / len(splits), left + shift + (root,)))
+    return out
+
+@functools.cache
+def shape_table(n):
+    """(probabilities, is_leaf, position, left, right) arrays with one row per shape.
+
+    position/left/right list the internal nodes in postfix order, so step k of every
+    tree can be evaluated together once steps 0..k-1 are done.
+    """
+    probs, programs = zip(*shapes(n))
+    is_leaf = np.array([[c is None for c in p] for p in programs])
+    internal = [[(i, c) for i, c in enumerate(p) if c is not None] for p in programs]
+    position = np.array([[i for i, _ in nodes] for nodes in internal]).reshape(len(probs), n - 1)
+    left = np.array([[c[0] for _, c in nodes] for nodes in internal]).reshape(len(probs), n - 1)
+    right = np.array([[c[1] for _, c in nodes] for nodes in internal]).reshape(len(probs), n - 1)
+    return np.array(probs), is_leaf, position, left, right
+
+def generate_batch(size, rng, n=NUMBER_COUNT):
+    """Returns (is_leaf, ops, vals, ok) for size repaired trees.
+
+    is_leaf/vals are (size, 2n-1) in postfix order, ops is (size, n-1) for the internal
+    nodes in the same order, ok flags trees that stayed inside int64.
+    """
+    probs, leaf_table, pos_table, left_table, right_table = shape_table(n)
+    width = 2 * n - 1
+    ids = rng.choice(len(probs), size=size, p=probs)
+    base = np.arange(size) * width # flat offsets so every gather/scatter is a 1-d take/put
+    position, left, right = (t[ids].T + base for t in (pos_table, left_table, right_table))
+    vals = rng.integers(NUMBER_RANGE[0], NUMBER_RANGE[1] + 1, size=size * width)
+    ops = rng.integers(0, len(OPS), size=(n - 1, size))
+    ok = np.ones(size, dtype=bool)
+
+    for start in range(0, size, CHUNK): # a chunk of rows stays in cache through all n - 1 steps
+        rows = slice(start, start + CHUNK)
+        for k in range(n - 1):
+            op, lc, rc, good = ops[k, rows], left[k, rows], right[k, rows], ok[rows]
+            l, r = vals[lc], vals[rc]
+
+            # --- DIVISION: R == 0 -> 1, L % R != 0 -> L = R * randint(1, 10)
+            div = np.flatnonzero(op == DIV)
+            dl, dr = l[div], r[div]
+            dr[dr == 0] = 1
+            fix = dl % dr != 0
+            dl[fix] = dr[fix] * rng.integers(1, 11, size=fix.sum())
+            l[div], r[div] = dl, dr
+            vals[lc[div]], vals[rc[div]] = dl, dr # only repaired children need writing back
+
+            # --- POWER: |R| > 4 -> randint(2, 4), |L| > 10 -> randint(2, 5), fall back to + if it blows up
+            pw = np.flatnonzero(op == POW)
+            pl, pr = l[pw], r[pw]
+            big = np.abs(pr) > 4
+            pr[big] = rng.integers(2, 5, size=big.sum())
+            big = np.abs(pl) > 10
+            pl[big] = rng.integers(2, 6, size=big.sum())
+            neg = pr < 0
+            with np.errstate(all='ignore'):
+                res_pow = np.power(pl, np.where(neg, 0, pr))
+            res_pow[neg] = np.where(pl[neg] == 1, 1, np.where(pl[neg] == -1, 1 - 2 * (pr[neg] % 2), 0)) # int(l ** r) for r < 0
+            bad = (neg & (pl == 0)) | (np.abs(res_pow) > 200000)
+            op[pw[bad]] = ADD
+            l[pw], r[pw] = pl, pr
+            vals[lc[pw]], vals[rc[pw]] = pl, pr
+
+            # --- Final Evaluation: whole-row arithmetic is cheaper than masked gathers, division and powers are patched in
+            mul = op == MUL
+            res = np.where(mul, l * r, np.where(op == SUB, l - r, l + r))
+            good &= ~mul | (np.abs(l.astype(float) * r) < LIMIT)
+            res[div] = l[div] // r[div]
+            sel = pw[~bad]; res[sel] = res_pow[~bad]
+            good &= np.abs(res) < LIMIT
+
+            vals[position[k, rows]] = res
+
+    return leaf_table[ids], ops.T, vals.reshape(size, width), ok
+
+def accepted(vals, ok):
+    root = vals[:, -1]
+    return ok & (TARGET_RANGE[0] <= root) & (root <= TARGET_RANGE[1])
+
+def batch_stats(is_leaf, ops, vals, ok):
+    """(ops counts, leaf value counts, targets) over the trees that land in TARGET_RANGE."""
+    keep = accepted(vals, ok)
+    op_counts = np.bincount(ops[keep].ravel(), minlength=len(OPS))
+    leaves = vals[keep][is_leaf[keep]]
+    return dict(zip(OPS, op_counts.tolist())), np.unique(leaves, return_counts=True), vals[keep, -1]
+
+if __name__ == '__main__':
+    # usage: ./batch_repair.py [trees] [batch size]
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    rng = np.random.default_rng()
+    st, valid = time.time(), 0
+    for done in range(0, total, batch):
+        is_leaf, ops, vals, ok = generate_batch(min(batch, total - done), rng)
+        valid += int(accepted(vals, ok).sum())
+    elapsed = time.time() - st
+    print(f"{total} candidates in {elapsed:.2f}s ({total/elapsed:,.0f}/s), {valid} valid ({valid/total:.1%})")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# times each puzzle generator until it returns a value in TARGET_RANGE (generate_puzzle rows include their own retries)
+# usage: ./benchmark.py [--puzzles N] [--out results.json] [--compare previous.json]
+import argparse, json, os, random, subprocess, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'math_games'))
+import bias_test, old, target_first, test, twentyfour
+
+MODULES = [bias_test, old, target_first, test, twentyfour]
+
+def twentyfour_step():
+  puzzle = twentyfour.generate_puzzle()
+  return puzzle and puzzle[1]
+
+def old_step():
+  puzzle = old.generate_puzzle()
+  return puzzle and puzzle[1]
+
+def test_step():
+  puzzle = test.generate_puzzle()
+  return puzzle and puzzle[1]
+
+def bias_test_step():
+  return bias_test.evaluate_and_repair(bias_test.generate_skeleton(bias_test.NUMBER_COUNT))
+
+def target_first_step():
+  return target_first.generate_targeted()[1]
+
+GENERATORS = {
+  'twentyfour.generate_puzzle': twentyfour_step,
+  'old.generate_puzzle': old_step,
+  'test.generate_puzzle': test_step,
+  'bias_test.evaluate_and_repair': bias_test_step,
+  'target_first.generate_targeted': target_first_step,
+}
+
+def configure(count, numbers, targets):
+  for module in MODULES:
+    module.NUMBER_COUNT, module.NUMBER_RANGE, module.TARGET_RANGE = count, list(numbers), list(targets)
+
+def run(step, puzzles, targets):
+  """Returns (per-puzzle latencies in ns, step calls) for puzzles accepted puzzles; a generate_puzzle step retries internally."""
+  latencies, steps = [], 0
+  for _ in range(puzzles):
+    st = time.perf_counter_ns()
+    while True:
+      steps += 1
+      try: value = step()
+      except (ZeroDivisionError, OverflowError): continue # counted as a rejected candidate
+      if value is not None and targets[0] <= value <= targets[1] and value == int(value): break
+    latencies.append(time.perf_counter_ns() - st)
+  return latencies, steps
+
+def percentile(sorted_vals, p): return sorted_vals[min(len(sorted_vals) - 1, int(p / 100 * len(sorted_vals)))]
+
+def bench(step, args):
+  random.seed(args.seed)
+  run(step, args.warmup, args.targets)
+  random.seed(args.seed)
+  st = time.perf_counter()
+  latencies, steps = run(step, args.puzzles, args.targets)
+  elapsed = time.perf_counter() - st
+  random.seed(args.seed)
+  tracemalloc.start()
+  run(step, max(1, args.puzzles // 10), args.targets)
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  latencies.sort()
+  return {
+    'puzzles_per_sec': args.puzzles / elapsed,
+    'acceptance': args.puzzles / steps,
+    'p50_us': percentile(latencies, 50) / 1e3,
+    'p95_us': percentile(latencies, 95) / 1e3,
+    'p99_us': percentile(latencies, 99) / 1e3,
+    'peak_kib': peak / 1024,
+  }
+
+def commit():
+  try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+  except OSError: return None
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--puzzles', type=int, default=2000)
+  parser.add_argument('--warmup', type=int, default=200)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--count', type=int, default=5)
+  parser.add_argument('--numbers', type=int, nargs=2, default=[2, 20])
+  parser.add_argument('--targets', type=int, nargs=2, default=[10, 400])
+  parser.add_argument('--only', nargs='*', default=list(GENERATORS), help='generator names to run')
+  parser.add_argument('--out', help='write results as JSON')
+  parser.add_argument('--compare', help='previous JSON results to show speedups against')
+  args = parser.parse_args()
+
+  configure(args.count, args.numbers, args.targets)
+  previous = json.load(open(args.compare))['results'] if args.compare else {}
+  results = {}
+  print(f"{'generator':34} {'puzzles/s':>10} {'accept':>7} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'peak KiB':>9}")
+  for name in args.only:
+    r = results[name] = bench(GENERATORS[name], args)
+    line = f"{name:34} {r['puzzles_per_sec']:10.0f} {r['acceptance']:7.1%} {r['p50_us']:9.1f} {r['p95_us']:9.1f} {r['p99_us']:9.1f} {r['peak_kib']:9.1f}"
+    if name in previous: line += f"  ({r['puzzles_per_sec'] / previous[name]['puzzles_per_sec']:.2f}x)"
+    print(line)
+
+  if args.out:
+    settings = {k: getattr(args, k) for k in ('puzzles', 'warmup', 'seed', 'count', 'numbers', 'targets')}
+    with open(args.out, 'w') as f: json.dump({'commit': commit(), 'python': sys.version.split()[0], 'settings': settings, 'results': results}, f, indent=2)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# the exact distributions behind bias_test's histograms, by inside/outside dynamic
+# programming over subtree sizes instead of sampling
+# usage: ./bias_exact.py [--count N] [--numbers LO HI] [--targets LO HI] [--epsilon E]
+#                        [--samples N] [--out stats.json] [--plot]
+# the defaults are small: bias_test's 8 numbers in [6, 100] would need grids of ~1e9 cells past 4 numbers
+import argparse, math, time
+import numpy as np
+import bias_test
+from bias_test import OPS
+from streaming_stats import SampleStats
+
+COUNT, NUMBER_RANGE, TARGET_RANGE = 4, [2, 20], [10, 100] # about a second
+EPSILON = 1e-6 # probability mass dropped per subtree size, from its least likely values
+CHUNK = 1 << 22 # grid cells per step
+MAX_CELLS = 1 << 27 # per split, refused past this rather than running for hours
+LIMIT = 2.0 ** 63
+POW_LIMIT = 200000 # evaluate_and_repair falls back to + past this
+ADD, POW = OPS.index('+'), OPS.index('**')
+
+def splits(m):
+    """(left size, probability) for generate_skeleton(m)."""
+    return [(1, 1.0)] if m == 2 else [(a, 1 / (m - 1)) for a in range(1, m)]
+
+def arith(code, l, r):
+    """+, - or * on int64 grids, 0 where the exact result would not fit in int64."""
+    f = l.astype(float)
+    exact = l + r if code == 0 else l - r if code == 1 else l * r
+    approx = f + r if code == 0 else f - r if code == 1 else f * r
+    return np.where(np.abs(approx) < LIMIT, exact, 0)
+
+def power(l, r):
+    """(int(l ** r), fallback) for |l| <= 10, |r| <= 4; fallback where it raises or exceeds POW_LIMIT."""
+    neg = r < 0
+    res = np.power(l, np.where(neg, 0, r))
+    res = np.where(neg, np.where(l == 1, 1, np.where(l == -1, 1 - 2 * (r % 2), 0)), res) # int(l ** r) for r < 0
+    return res, (neg & (l == 0)) | (np.abs(res) > POW_LIMIT)
+
+def outcomes(code, l, r):
+    """(left, right, op, result, weight) for every branch evaluate_and_repair can take on grids l, r."""
+    if OPS[code] in ('+', '-', '*'): yield l, r, code, arith(code, l, r), 1.0
+    elif OPS[code] == '/':
+        r = np.where(r == 0, 1, r)
+        fits = l % r == 0
+        yield l, r, code, l // r, fits * 1.0
+        for q in range(1, 11): yield r * q, r, code, np.int64(q), ~fits / 10
+    else:
+        big_r, big_l = np.abs(r) > 4, np.abs(l) > 10
+        for e in (None, 2, 3, 4):
+            rf, wr = (r, ~big_r * 1.0) if e is None else (np.int64(e), big_r / 3)
+            for b in (None, 2, 3, 4, 5):
+                lf, wl = (l, ~big_l * 1.0) if b is None else (np.int64(b), big_l / 4)
+                res, fallback = power(lf, rf)
+                yield lf, rf, np.where(fallback, ADD, POW), np.where(fallback, lf + rf, res), wr * wl
+
+def lookup(values, weights, keys):
+    """weights[values == key] for each key, 0 where key is not in (sorted) values."""
+    i = np.minimum(np.searchsorted(values, keys), len(values) - 1)
+    return np.where(values[i] == keys, weights[i], 0.0)
+
+class Accumulator:
+    """(values, weights) pairs summed per value, collapsed whenever CHUNK of them pile up."""
+    def __init__(self): self.parts, self.size = [], 0
+
+    def add(self, values, weights):
+        self.parts.append((values, weights))
+        self.size += len(values)
+        if self.size > CHUNK: self.parts = [aggregate(self.parts)]; self.size = len(self.parts[0][0])
+
+    def total(self): return aggregate(self.parts)
+
+def aggregate(parts):
+    """Sum (values, weights) pairs into one sorted distribution."""
+    values = np.concatenate([v for v, _ in parts]) if parts else np.zeros(0, np.int64)
+    weights = np.concatenate([w for _, w in parts]) if parts else np.zeros(0)
+    values, inverse = np.unique(values, return_inverse=True)
+    return values, np.bincount(inverse.ravel(), weights, minlength=len(values))
+
+class Analysis:
+    def __init__(self, count, number_range, target_range, epsilon=EPSILON):
+        self.count, self.number_range, self.target_range, self.epsilon = count, number_range, target_range, epsilon
+        self.inside, self.dropped = {}, {}
+        lo, hi = number_range
+        self.inside[1] = np.arange(lo, hi + 1), np.full(hi - lo + 1, 1 / (hi - lo + 1))
+        self.dropped[1] = 0.0
+
+    def grids(self, m):
+        """(a, b, rows, pl, pr, weight, branch) over every split, operator, chunk of left values and repair branch of size m.
+
+        pl/pr are the children's probabilities as a column and a row, weight the split's and operator's probability.
+        """
+        for a, split in splits(m):
+            (lv, lp), (rv, rp) = self.dist(a), self.dist(m - a)
+            if len(lv) * len(rv) > MAX_CELLS:
+                raise ValueError(f'{a} + {m - a} leaves make a grid of {len(lv) * len(rv):.1e} cells, over {MAX_CELLS:.1e}: use fewer numbers or a narrower range')
+            step = max(1, CHUNK // max(1, len(rv)))
+            for start in range(0, len(lv), step):
+                rows = slice(start, start + step)
+                for code in range(len(OPS)):
+                    for branch in outcomes(code, lv[rows, None], rv[None, :]):
+                        yield a, m - a, rows, lp[rows, None], rp[None, :], split / len(OPS), branch
+
+    def dist(self, k):
+        """(values, probabilities) of a subtree of k leaves, memoized per size."""
+        if k not in self.inside:
+            total = Accumulator()
+            for a, b, rows, pl, pr, weight, (lf, rf, op, res, w) in self.grids(k):
+                res = np.reshape(res, (1,) * (2 - np.ndim(res)) + np.shape(res))
+                mass = pl * pr * weight * w
+                mass = mass.sum(tuple(i for i in (0, 1) if res.shape[i] == 1), keepdims=True) # constant along that side
+                mass = np.broadcast_to(mass, np.broadcast_shapes(mass.shape, res.shape))
+                keep = mass > 0
+                total.add(np.broadcast_to(res, mass.shape)[keep], mass[keep])
+            values, probs = total.total()
+            order = np.argsort(probs, kind='stable')
+            keep = np.ones(len(probs), bool)
+            keep[order[np.cumsum(probs[order]) <= self.epsilon]] = False # the least likely values, up to epsilon of mass
+            self.dropped[k] = float(probs[~keep].sum())
+            self.inside[k] = values[keep], probs[keep]
+        return self.inside[k]
+
+    def run(self):
+        """Fills accept, targets, ops and leaves (expected counts per accepted puzzle)."""
+        n, (lo, hi) = self.count, self.target_range
+        values, probs = self.dist(n)
+        outside = {k: np.zeros(len(self.dist(k)[0])) for k in range(1, n + 1)}
+        outside[n] = ((lo <= values) & (values <= hi)) * 1.0
+        ops, leaves = np.zeros(len(OPS)), Accumulator()
+        for m in range(n, 1, -1):
+            parent = self.dist(m)[0], outside[m]
+            for a, b, rows, pl, pr, weight, (lf, rf, op, res, w) in self.grids(m):
+                shape = np.broadcast_shapes(pl.shape, pr.shape, np.shape(res))
+                g = np.broadcast_to(weight * w * lookup(*parent, res), shape) # acceptance per (left, right) pair
+                outside[a][rows] += (g * pr).sum(1)
+                outside[b] += (g * pl).sum(0)
+                mass = g * pl * pr
+                keep = mass > 0
+                ops += np.bincount(np.broadcast_to(op, shape)[keep], mass[keep], minlength=len(OPS))
+                if a == 1: leaves.add(np.broadcast_to(lf, shape)[keep], mass[keep])
+                if b == 1: leaves.add(np.broadcast_to(rf, shape)[keep], mass[keep])
+        if n == 1: leaves.add(values, outside[1] * probs)
+        in_range = (lo <= values) & (values <= hi)
+        self.accept = float(probs[in_range].sum())
+        self.targets = values[in_range], probs[in_range] / self.accept
+        self.ops = dict(zip(OPS, (ops / self.accept).tolist()))
+        leaf_values, leaf_mass = leaves.total()
+        self.leaves = leaf_values, leaf_mass / self.accept
+        return self
+
+    def to_stats(self, samples):
+        """The expected tallies of a bias_test run with this many samples, as SampleStats."""
+        stats = SampleStats(self.number_range, self.target_range, target_bins=30)
+        stats.samples, stats.attempts = samples, round(samples / self.accept)
+        stats.ops.update({op: round(c * samples) for op, c in self.ops.items()})
+        for v, c in zip(*self.leaves): stats.leaves.add(int(v), round(c * samples))
+        for v, p in zip(*self.targets): stats.targets.add(int(v), round(p * samples))
+        values, probs = self.targets
+        mean = float((values * probs).sum())
+        m = stats.target_moments
+        m.n, m.mean, m.m2, m.min, m.max = samples, mean, float((probs * (values - mean) ** 2).sum()) * samples, int(values.min()), int(values.max())
+        return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=COUNT)
+    parser.add_argument('--numbers', type=int, nargs=2, default=NUMBER_RANGE)
+    parser.add_argument('--targets', type=int, nargs=2, default=TARGET_RANGE)
+    parser.add_argument('--epsilon', type=float, default=EPSILON, help='probability mass to drop per subtree size, least likely values first')
+    parser.add_argument('--samples', type=int, default=bias_test.SAMPLE_SIZE, help='scale of the --out/--plot tallies')
+    parser.add_argument('--out', help='write expected tallies as a bias_test SNAPSHOT')
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    st = time.time()
+    try: analysis = Analysis(args.count, args.numbers, args.targets, args.epsilon).run()
+    except ValueError as e: parser.error(str(e))
+    print(f"{args.count} numbers in {args.numbers}, targets in {args.targets}: {time.time() - st:.2f}s")
+    print(f"Success rate: {analysis.accept:.4%}")
+    print(f"Dropped mass per size: " + (', '.join(f'{k}: {d:.2e}' for k, d in analysis.dropped.items() if d) or 'none'))
+    total = sum(analysis.ops.values())
+    print("Operators: " + ', '.join(f'{op} {c / total:.2%}' for op, c in analysis.ops.items()))
+    values, counts = analysis.leaves
+    inside = (args.numbers[0] <= values) & (values <= args.numbers[1])
+    print(f"Leaves: mean {float((values * counts).sum() / counts.sum()):.2f}, {counts[~inside].sum() / counts.sum():.2%} repaired out of NUMBER_RANGE")
+    values, probs = analysis.targets
+    mean = float((values * probs).sum())
+    print(f"Targets: mean {mean:.2f}, std {math.sqrt(float((probs * (values - mean) ** 2).sum())):.2f}, "
+          f"most likely {', '.join(f'{v} ({p:.2%})' for v, p in sorted(zip(values.tolist(), probs.tolist()), key=lambda t: -t[1])[:5])}")
+
+    if args.out or args.plot:
+        stats = analysis.to_stats(args.samples)
+        if args.out: stats.snapshot(args.out)
+        if args.plot:
+            import matplotlib.pyplot as plt
+            fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+            bias_test.plot_stats(axes, stats)
+            plt.tight_layout()
+            plt.show()
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
-import math, random, sys, time
-from collections import Counter
+import json, math, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
+import seeds
+from flat_tree import FlatTree, LEAF, OPS as FLAT_OPS
+from streaming_stats import LivePlot, SampleStats
 
 # --- Constraint Settings ---
 OPS = ['+', '-', '*', '/', '**']
@@ -9,169 +12,255 @@ TARGET_RANGE = [200, 400]
 NUMBER_RANGE = [6, 100]
 NUMBER_COUNT = 8
 SAMPLE_SIZE = 10000
+REPORT_EVERY = 1000
+CHUNK_SIZE = 2000 # samples per task, independent of the worker count so a SEED reruns the same chunks
+CHECKPOINT_CHUNK = 1000000 # per worker task in checkpointed runs, one checkpoint per round of tasks
 
-class Node:
-    def __init__(self, val=None, op=None, left=None, right=None, is_leaf=False):
-        self.val = val
-        self.op = op
-        self.left = left
-        self.right = right
-        self.is_leaf = is_leaf
-
-def generate_skeleton(n):
-    """Generates a random binary operator tree structure."""
-    if n == 1: return Node(is_leaf=True)
+def generate_skeleton(n, tree=None, rng=random):
+    """Generates a random binary operator tree structure (appended to tree in postfix order)."""
+    if tree is None: tree = FlatTree(vals=[]) # Python ints, like the old Node trees, so big powers stay exact
+    if n == 1:
+        tree.add_leaf()
+        return tree
     
     # Catalan-ish split
     if n == 2: split = 1
-    else: split = random.randint(1, n-1) 
+    else: split = rng.randint(1, n-1) 
     
-    return Node(op=random.choice(OPS), 
-                left=generate_skeleton(split), 
-                right=generate_skeleton(n - split))
+    op = rng.choice(OPS)
+    left = generate_skeleton(split, tree, rng).root
+    right = generate_skeleton(n - split, tree, rng).root
+    tree.add_node(op, left, right)
+    return tree
 
-def evaluate_and_repair(node):
+def evaluate_and_repair(tree, rng=random):
     """
-    Bottom-up traversal. 
+    Bottom-up pass (postfix order, so children are always done first). 
     1. Evaluates L and R.
     2. Checks if (L op R) is valid.
     3. If invalid, FORCES L or R to be different to make it valid.
     """
-    # 1. Base Case: Leaves
-    if node.is_leaf:
-        node.val = random.randint(*NUMBER_RANGE)
-        return node.val
+    vals = tree.vals
+    for i in range(len(tree)):
+        # 1. Base Case: Leaves
+        if tree.is_leaf(i):
+            vals[i] = rng.randint(*NUMBER_RANGE)
+            continue
 
-    # 2. Recurse (Post-Order)
-    l_val = evaluate_and_repair(node.left)
-    r_val = evaluate_and_repair(node.right)
+        # 2. Children (already evaluated)
+        left, right = tree.left[i], tree.right[i]
+        l_val = vals[left]
+        r_val = vals[right]
 
-    # 3. Constraint Solving
-    op = node.op
-    
-    # --- DIVISION LOGIC ---
-    if op == '/':
-        # Constraint: L % R == 0.
-        # Fix 1: If R is 0, make it 1.
-        if r_val == 0: 
-            r_val = 1
-            node.right.val = 1
-            
-        # Fix 2: If L % R != 0, change L to be (R * random_multiplier)
-        if l_val % r_val != 0:
-            # We want the result to be somewhat small, e.g., result <= 20
-            desired_result = random.randint(1, 10)
-            l_val = r_val * desired_result
-            node.left.val = l_val # Force the child node
-            
-    # --- POWER LOGIC ---
-    elif op == '**':
-        # Constraint: Result must be < 10^6 and not complex.
-        # Heuristic: Base > 1, Exponent usually small.
+        # 3. Constraint Solving
+        op = tree.op(i)
         
-        # Force Base to be small if Exponent is large
-        if abs(r_val) > 4:
-            r_val = random.randint(2, 4) # Force exponent down
-            node.right.val = r_val
+        # --- DIVISION LOGIC ---
+        if op == '/':
+            # Constraint: L % R == 0.
+            # Fix 1: If R is 0, make it 1.
+            if r_val == 0: 
+                r_val = 1
+                vals[right] = 1
+                
+            # Fix 2: If L % R != 0, change L to be (R * random_multiplier)
+            if l_val % r_val != 0:
+                # We want the result to be somewhat small, e.g., result <= 20
+                desired_result = rng.randint(1, 10)
+                l_val = r_val * desired_result
+                vals[left] = l_val # Force the child node
+                
+        # --- POWER LOGIC ---
+        elif op == '**':
+            # Constraint: Result must be < 10^6 and not complex.
+            # Heuristic: Base > 1, Exponent usually small.
             
-        if abs(l_val) > 10:
-            l_val = random.randint(2, 5) # Force base down
-            node.left.val = l_val
+            # Force Base to be small if Exponent is large
+            if abs(r_val) > 4:
+                r_val = rng.randint(2, 4) # Force exponent down
+                vals[right] = r_val
+                
+            if abs(l_val) > 10:
+                l_val = rng.randint(2, 5) # Force base down
+                vals[left] = l_val
 
-        # Safety check: if it's still gonna blow up, swap op
+            # Safety check: if it's still gonna blow up, swap op
+            try:
+                res = l_val ** r_val
+                if isinstance(res, complex) or abs(res) > 200000:
+                    op = '+' # Fallback
+                    tree.set_op(i, '+')
+            except:
+                op = '+'
+                tree.set_op(i, '+')
+
+        # 4. Final Evaluation
         try:
-            res = l_val ** r_val
-            if isinstance(res, complex) or abs(res) > 200000:
-                op = '+' # Fallback
-                node.op = '+'
+            if op == '+': res = l_val + r_val
+            elif op == '-': res = l_val - r_val
+            elif op == '*': res = l_val * r_val
+            elif op == '/': res = l_val // r_val
+            elif op == '**': res = int(l_val ** r_val)
+            vals[i] = res
         except:
-            op = '+'
-            node.op = '+'
+            res = vals[i] = 0 # Default failure case
 
-    # 4. Final Evaluation
-    try:
-        if op == '+': res = l_val + r_val
-        elif op == '-': res = l_val - r_val
-        elif op == '*': res = l_val * r_val
-        elif op == '/': res = l_val // r_val
-        elif op == '**': res = int(l_val ** r_val)
-    except:
-        res = 0 # Default failure case
-
-    node.val = res
-    return res
-
-def collect_stats(node, ops_counter, leaves_counter):
-    if node.is_leaf:
-        leaves_counter[node.val] += 1
-    else:
-        ops_counter[node.op] += 1
-        collect_stats(node.left, ops_counter, leaves_counter)
-        collect_stats(node.right, ops_counter, leaves_counter)
+    return vals[-1]
 
-def run_test():
-    print(f"Generating {SAMPLE_SIZE} valid puzzles...")
-    
-    ops_counts = Counter()
-    leaves_counts = Counter()
-    valid_targets = []
-    
-    generated = 0
-    attempts = 0
-    
-    start_time = time.time()
+def collect_stats(tree, stats):
+    for op, val in zip(tree.ops, tree.vals):
+        if op == LEAF: stats.leaves.add(val)
+        else: stats.ops[FLAT_OPS[op]] += 1
+
+def sample(n, seed=None, report=None, stats=None):
+    """Generates n valid puzzles into stats (a new SampleStats by default), calling report(stats) every REPORT_EVERY."""
+    rng = random.Random(seed) if seed is not None else random
+
+    if stats is None: stats = SampleStats(NUMBER_RANGE, TARGET_RANGE, target_bins=30)
+    goal, attempts = stats.samples + n, stats.attempts
 
     # Loop until we have enough SAMPLES
-    while generated < SAMPLE_SIZE:
-        attempts += 1
+    while stats.samples < goal:
+        stats.attempts += 1
         
         # 1. Generate Tree
-        root = generate_skeleton(NUMBER_COUNT)
+        root = generate_skeleton(NUMBER_COUNT, rng=rng)
         
         # 2. Force Integers without backtracking
-        res = evaluate_and_repair(root)
+        res = evaluate_and_repair(root, rng)
         
         # 3. Check if result is in Target Range
         if TARGET_RANGE[0] <= res <= TARGET_RANGE[1]:
-            collect_stats(root, ops_counts, leaves_counts)
-            valid_targets.append(res)
-            generated += 1
+            collect_stats(root, stats)
+            stats.add_target(res)
             
-            if generated % 1000 == 0:
-                print(f"  {generated}/{SAMPLE_SIZE}...")
+            if report and stats.samples % REPORT_EVERY == 0: report(stats)
         
         # Circuit breaker if we are just failing endlessly
-        if attempts > SAMPLE_SIZE * 50:
+        if stats.attempts - attempts > n * 50:
             print("Error: Rejection rate too high. Adjust constraints.")
             break
 
-    print(f"Finished. Total Attempts: {attempts}. Success Rate: {generated/attempts:.1%}")
-    print(f"Time: {time.time() - start_time:.2f}s")
-    
-    # --- PLOTTING ---
-    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5))
-    
+    return stats
+
+def plot_stats(axes, stats):
+    ax1, ax2, ax3 = axes
+
     # 1. Operators
-    ops_labels = ops_counts.keys()
-    ops_values = ops_counts.values()
+    ops_labels = stats.ops.keys()
+    ops_values = stats.ops.values()
     ax1.bar(ops_labels, ops_values, color='skyblue')
     ax1.set_title('Operator Usage')
     
     # 2. Leaves (Numbers used)
     # Filter specific range for cleaner plot
-    leaf_vals = sorted(leaves_counts.items())
-    x_leaf, y_leaf = zip(*leaf_vals)
+    x_leaf, y_leaf = stats.leaves.edges()[:-1], stats.leaves.counts
     ax2.plot(x_leaf, y_leaf, color='green', alpha=0.7)
     ax2.fill_between(x_leaf, y_leaf, color='green', alpha=0.3)
     ax2.set_title('Leaf Value Frequency')
     ax2.set_xlim(NUMBER_RANGE)
     
     # 3. Targets
-    ax3.hist(valid_targets, bins=30, color='orange', alpha=0.7)
+    ax3.stairs(stats.targets.counts, stats.targets.edges(), fill=True, color='orange', alpha=0.7)
     ax3.set_title('Final Target Value Distribution')
+
+def settings():
+    return {'ops': OPS, 'target_range': TARGET_RANGE, 'number_range': NUMBER_RANGE, 'number_count': NUMBER_COUNT}
+
+def save_checkpoint(path, stats, seed, tasks):
+    """Tallies plus the root seed and tasks done (the RNG state: task i samples with seeds.spawn(seed, ...)[i]),
+    written atomically so a crash mid-write keeps the last one."""
+    with open(path + '.tmp', 'w') as f: json.dump({'settings': settings(), 'seed': seed, 'tasks': tasks, 'stats': stats.to_dict()}, f)
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(path):
+    with open(path) as f: state = json.load(f)
+    if state['settings'] != settings(): raise ValueError(f"{path} was sampled with {state['settings']}, not {settings()}")
+    return SampleStats.from_dict(state['stats']), state['seed'], state['tasks']
+
+def save_plots(stats, path):
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+    plot_stats(axes, stats)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def run_checkpointed(path, samples, workers=1):
+    """
+    Samples until there are `samples`, picking up from the checkpoint at path if there is one.
+    Work goes out in rounds of one CHECKPOINT_CHUNK task per worker, task i on its own spawned seed;
+    after every round the tallies and the task count go to path and the plots to path with its extension
+    swapped for .png, so a run that dies loses at most one round, and rerunning with a larger count extends it.
+    """
+    plt.switch_backend('Agg') # plots only ever go to files here
+    if os.path.exists(path):
+        stats, seed, tasks = load_checkpoint(path)
+        print(f"Resuming {path} at {stats.samples}/{samples} samples...")
+    else:
+        stats, seed, tasks = SampleStats(NUMBER_RANGE, TARGET_RANGE, target_bins=30), seeds.root_seed(), 0
+        print(f"Generating {samples} valid puzzles on {workers} worker(s), seed {seed}, checkpointing to {path}...")
+    start_time, start_samples = time.time(), stats.samples
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        while stats.samples < samples:
+            left = samples - stats.samples
+            chunks = [min(CHECKPOINT_CHUNK, left - i * CHECKPOINT_CHUNK) for i in range(min(workers, -(-left // CHECKPOINT_CHUNK)))]
+            task_seeds = [seeds.derive(seed, seeds.SPAWN, tasks + i) for i in range(len(chunks))]
+            parts = list((pool.map if pool else map)(sample, chunks, task_seeds))
+            for part in parts: stats.merge(part)
+            tasks += len(chunks)
+            save_checkpoint(path, stats, seed, tasks)
+            save_plots(stats, os.path.splitext(path)[0] + '.png')
+            print(f"  {stats.samples}/{samples}...")
+            if any(part.samples < n for part, n in zip(parts, chunks)): break # sample() hit its circuit breaker
+    finally:
+        if pool: pool.shutdown(cancel_futures=True)
+    print(f"Finished. Total Attempts: {stats.attempts}. Success Rate: {stats.samples/stats.attempts:.1%}")
+    print(f"Time: {time.time() - start_time:.2f}s for {stats.samples - start_samples} samples. Plots: {os.path.splitext(path)[0]}.png")
+
+def run_test(workers=1, samples=SAMPLE_SIZE):
+    # CHECKPOINT=<path> makes the run resumable and headless, see run_checkpointed
+    if os.getenv("CHECKPOINT"): return run_checkpointed(os.getenv("CHECKPOINT"), samples, workers)
+    seed = seeds.root_seed() # SEED=<seed> reruns a run exactly
+    print(f"Generating {samples} valid puzzles on {workers} worker(s), seed {seed}...")
     
+    start_time = time.time()
+
+    # LIVE=1 redraws the plots as samples come in, SNAPSHOT=<path> keeps a JSON copy of the tallies
+    live = LivePlot(plot_stats) if os.getenv("LIVE") else None
+    snapshot = os.getenv("SNAPSHOT")
+    def report(stats):
+        print(f"  {stats.samples}/{samples}...")
+        if live: live.update(stats)
+        if snapshot: stats.snapshot(snapshot)
+
+    # Chunk i samples with spawned seed i. Chunks depend only on the sample count, so a SEED
+    # gives the same tallies with any number of workers.
+    chunks = [min(CHUNK_SIZE, samples - i) for i in range(0, samples, CHUNK_SIZE)]
+    stats = SampleStats(NUMBER_RANGE, TARGET_RANGE, target_bins=30)
+    if workers == 1:
+        for n, chunk_seed in zip(chunks, seeds.spawn(seed, len(chunks))): sample(n, chunk_seed, report, stats)
+    else:
+        # Workers sample chunks in parallel; tallies are merged (and reported) as chunks finish
+        with ProcessPoolExecutor(workers) as pool:
+            for part in pool.map(sample, chunks, seeds.spawn(seed, len(chunks))):
+                stats.merge(part)
+                report(stats)
+
+    print(f"Finished. Total Attempts: {stats.attempts}. Success Rate: {stats.samples/stats.attempts:.1%}")
+    print(f"Time: {time.time() - start_time:.2f}s")
+    
+    # --- PLOTTING ---
+    if live:
+        live.update(stats)
+        live.show()
+        return
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+    plot_stats(axes, stats)
     plt.tight_layout()
     plt.show()
 
 if __name__ == "__main__":
-    run_test()
+    # usage: ./bias_test.py [workers] [samples]
+    # CHECKPOINT=<path> resumes from / checkpoints to path and plots to path's .png sibling (run.json -> run.png) instead of a window
+    run_test(int(sys.argv[1]) if len(sys.argv) > 1 else 1, int(sys.argv[2]) if len(sys.argv) > 2 else SAMPLE_SIZE)
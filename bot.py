@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# headless load test: thousands of asyncio sessions play the games' generate/check
+# functions and record generation, check and event-loop lag percentiles
+# usage: ./bot.py [--games zetamac twentyfour ...] [--sessions 1000] [--rounds 10] [--think 0.05] [--out results.json]
+import argparse, asyncio, json, os, sys, time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'math_games'))
+import old, transcendental_speed, twentyfour, zetamac
+import seeds
+from canonical import to_tuple
+
+PERCENTILES = [50, 95, 99]
+
+def wrong_expression(numbers): return ' + '.join(map(str, numbers))
+
+def safe_value(tree):
+  """Exact value of a tuple tree, None where eval() would divide by zero or build an enormous power."""
+  if isinstance(tree, int): return Fraction(tree)
+  op, l, r = tree[0], safe_value(tree[1]), safe_value(tree[2])
+  if l is None or r is None or op == '**' and abs(l) > 1 and abs(r) > 64: return None
+  return twentyfour.apply(op, l, r)
+
+def play_zetamac(rng, error_rate):
+  st = time.perf_counter_ns()
+  op, prompt, exact = zetamac.new_question(rng)
+  gen = time.perf_counter_ns() - st
+  answers = ([str(exact + 1)] if rng.random() < error_rate else []) + [str(exact)]
+  st = time.perf_counter_ns()
+  results = [zetamac.check(a, exact) for a in answers]
+  return gen, time.perf_counter_ns() - st, results[-1] is True, len(answers)
+
+def play_transcendental(rng, error_rate):
+  st = time.perf_counter_ns()
+  name, prompt, exact = transcendental_speed.new_question(rng)
+  gen = time.perf_counter_ns() - st
+  answers = ([str(2 * exact + 1)] if rng.random() < error_rate else []) + [repr(exact)]
+  st = time.perf_counter_ns()
+  results = [transcendental_speed.check(a, exact) for a in answers]
+  return gen, time.perf_counter_ns() - st, results[-1] is True, len(answers)
+
+def play_twentyfour(rng, error_rate, check=twentyfour.check_answer):
+  st = time.perf_counter_ns()
+  while (puzzle := twentyfour.generate_puzzle(rng)) is None: pass
+  gen = time.perf_counter_ns() - st
+  numbers, target, tree = puzzle
+  numbers = sorted(numbers)
+  answers = ([wrong_expression(numbers)] if rng.random() < error_rate else []) + [twentyfour.render(tree)]
+  st = time.perf_counter_ns()
+  results = [twentyfour.judge(a, numbers, target, check) for a in answers]
+  return gen, time.perf_counter_ns() - st, results[-1][0], len(answers)
+
+def play_old(rng, error_rate):
+  st = time.perf_counter_ns()
+  while (puzzle := old.generate_puzzle(rng)) is None: pass
+  gen = time.perf_counter_ns() - st
+  root, target = puzzle
+  leaves = sorted(old.get_leaves(root))
+  answers = ([wrong_expression(leaves)] if rng.random() < error_rate else []) + [str(root)]
+  if safe_value(to_tuple(root)) is None: answers.pop() # repair can leave a solution that doesn't evaluate, don't hang on it
+  st, correct = time.perf_counter_ns(), False
+  for a in answers:
+    try: correct = old.judge(a, leaves, target)[0]
+    except Exception: correct = False # the game prints these as errors
+  return gen, time.perf_counter_ns() - st, correct, len(answers)
+
+GAMES = {'zetamac': play_zetamac, 'transcendental_speed': play_transcendental, 'twentyfour': play_twentyfour, 'old': play_old}
+
+class Results:
+  def __init__(self): self.gen, self.check, self.lag, self.correct, self.answers = [], [], [], 0, 0
+
+  def summary(self, elapsed):
+    def pct(xs):
+      xs = sorted(xs)
+      return {f'p{p}_us': xs[min(len(xs) - 1, len(xs) * p // 100)] / 1e3 for p in PERCENTILES}
+    rounds = len(self.gen)
+    return {'rounds': rounds, 'rounds_per_sec': rounds / elapsed, 'correct': self.correct / rounds, 'answers_per_round': self.answers / rounds,
+            'generate': pct(self.gen), 'check': pct(self.check), 'loop_lag': pct(self.lag)}
+
+async def session(play, rounds, think, error_rate, rng, results):
+  loop = asyncio.get_running_loop()
+  for _ in range(rounds):
+    due = loop.time()
+    if think:
+      due += rng.expovariate(1 / think)
+      await asyncio.sleep(due - loop.time())
+    else: await asyncio.sleep(0) # still yield, so sessions interleave round by round
+    results.lag.append(int((loop.time() - due) * 1e9))
+    gen, check, correct, answers = await play(rng, error_rate)
+    results.gen.append(gen); results.check.append(check)
+    results.correct += correct; results.answers += answers
+
+async def run(game, args, sandbox=None):
+  play = GAMES[game]
+  if sandbox: # checks wait on a worker from a thread, so other sessions keep playing meanwhile
+    check = lambda tree, target: sandbox.call(twentyfour.check_answer, tree, target)
+    async def step(rng, error_rate): return await asyncio.to_thread(play, rng, error_rate, check)
+  else:
+    async def step(rng, error_rate): return play(rng, error_rate)
+  results = Results()
+  st = time.perf_counter()
+  await asyncio.gather(*(session(step, args.rounds, args.think, args.error_rate, seeds.stream(args.seed, i), results)
+                         for i in range(args.sessions)))
+  return results.summary(time.perf_counter() - st)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--games', nargs='*', default=list(GAMES), choices=list(GAMES))
+  parser.add_argument('--sessions', type=int, default=1000)
+  parser.add_argument('--rounds', type=int, default=10)
+  parser.add_argument('--think', type=float, default=0.05, help='mean seconds between rounds, 0 for none')
+  parser.add_argument('--error-rate', type=float, default=0.1)
+  parser.add_argument('--sandbox', type=int, default=0, help='check twentyfour answers in a Sandbox with this many workers')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--out', help='write results as JSON')
+  args = parser.parse_args()
+
+  sandbox = None
+  if args.sandbox and 'twentyfour' in args.games:
+    from sandbox import Sandbox
+    sandbox = Sandbox(args.sandbox, twentyfour.SANDBOX_TIMEOUT, twentyfour.SANDBOX_MEMORY_MB)
+
+  all_results = {}
+  print(f"{'game':22} {'rounds/s':>9} {'correct':>8} {'gen p50/p99 us':>17} {'check p50/p99 us':>19} {'lag p99 ms':>11}")
+  for game in args.games:
+    r = all_results[game] = asyncio.run(run(game, args, sandbox if game == 'twentyfour' else None))
+    print(f"{game:22} {r['rounds_per_sec']:9.0f} {r['correct']:8.1%} {r['generate']['p50_us']:8.1f}/{r['generate']['p99_us']:<8.1f} "
+          f"{r['check']['p50_us']:9.1f}/{r['check']['p99_us']:<9.1f} {r['loop_lag']['p99_us'] / 1e3:11.2f}")
+  if sandbox: sandbox.close()
+  if args.out:
+    with open(args.out, 'w') as f: json.dump({'settings': vars(args), 'results': all_results}, f, indent=2)
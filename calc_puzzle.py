@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 
+import functools, itertools, math, random, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import sympy
+from sympy import E, Integer, Integral, cos, exp, log, pi, preorder_traversal, sin, sqrt
+import seeds
+from complexity import Complexity
+from shapes import sample
 
 """
 given a set of primitives and a target value,
@@ -33,6 +40,143 @@ DEPTH_RANGE = [2,4]
 BREADTH_RANGE = [4,8]
 MAX_TARGET_NODES = 10
 MIN_OPACITY = 0.3
+SEARCH_WORKERS = 2
+CANDIDATE_TIMEOUT = 2.0 # seconds per candidate F/b inside a worker
+GENERATION_BUDGET = 4.0 # seconds until generate() gives up and serves a spare/fallback
+VALIDATION_TIMEOUT = 2.0
+SANDBOX_MEMORY_MB = 1024
+SPARES = 8
+CONTINUITY_SAMPLES = 64
+
+x = sympy.Symbol('x')
+BOUNDS = [Integer(1), Integer(2), pi, pi/2, pi/4, E, log(2)]
+UNARY = [sin, cos, exp, log, sqrt]
+BINARY = {'+': lambda l, r: l + r, '-': lambda l, r: l - r, '*': lambda l, r: l * r, '/': lambda l, r: l / r}
+FALLBACK = {'bound': 'pi', 'integrand': 'sin(x)', 'target': '2', 'primitives': ['pi', 'sin', 'x']}
+
+complexity = Complexity() # per process, so each warm worker keeps its own
+nodes, simp = complexity.nodes, complexity.simplify
+
+@functools.lru_cache(maxsize=4096)
+def deriv(expr): return sympy.diff(expr, x)
+
+def primitives(*exprs):
+  """Sorted multiset of the functions, symbols and numbers that make up exprs."""
+  out = []
+  for expr in exprs:
+    for node in preorder_traversal(expr):
+      if isinstance(node, sympy.Function): out.append(node.func.__name__)
+      elif node.is_Atom: out.append(str(node))
+  return sorted(out)
+
+def random_expr(rng, breadth, depth):
+  """F with `breadth` leaves on a uniform random shape, unary functions nested at most `depth` deep."""
+  stack = []
+  for leaf in sample(breadth, rng):
+    if leaf: e, d = (x if rng.random() < 0.6 else Integer(rng.randint(1, 3))), 0
+    else:
+      (r, dr), (l, dl) = stack.pop(), stack.pop()
+      e, d = BINARY[rng.choice(list(BINARY))](l, r), max(dl, dr)
+    if d < depth and rng.random() < 0.3: e, d = rng.choice(UNARY)(e), d + 1
+    stack.append((e, d))
+  return stack[0][0]
+
+def continuous(F, f, b):
+  """Whether F and f are real and finite on [0, b] (sampled), so F(b) - F(0) is the integral of f."""
+  try:
+    F, f, b = sympy.lambdify(x, F, 'math'), sympy.lambdify(x, f, 'math'), float(b)
+    return all(math.isfinite(F(t)) and math.isfinite(f(t)) for t in (b * i / CONTINUITY_SAMPLES for i in range(CONTINUITY_SAMPLES + 1)))
+  except (ArithmeticError, ValueError, TypeError): return False
+
+def candidate(seed):
+  """One b and F from seed, as a puzzle dict of strings, or None if it is not a good puzzle."""
+  rng = random.Random(seed)
+  b = rng.choice(BOUNDS)
+  F = simp(random_expr(rng, rng.randint(*BREADTH_RANGE), rng.randint(*DEPTH_RANGE)))
+  if not F.has(x): return None
+  f = simp(deriv(F))
+  if not continuous(F, f, b): return None
+  with sympy.evaluate(False): raw = F.xreplace({x: b}) - F.xreplace({x: 0})
+  y = simp(F.subs(x, b) - F.subs(x, 0))
+  if nodes(y) > MAX_TARGET_NODES or y.has(x) or not y.is_finite: return None
+  if complexity.opacity(raw, y) < MIN_OPACITY: return None
+  return {'bound': str(b), 'integrand': str(f), 'target': str(y), 'primitives': primitives(f, b)}
+
+def check(user_input, puzzle):
+  """(correct, message) for an Integral(g, (x, 0, c)) answer; meant to run inside a Sandbox."""
+  answer = sympy.parse_expr(user_input)
+  if not isinstance(answer, Integral) or len(answer.limits) != 1 or len(answer.limits[0]) != 3 or answer.limits[0][1] != 0:
+    return False, 'Answer as Integral(<integrand>, (x, 0, <bound>))'
+  var, _, c = answer.limits[0]
+  used = primitives(answer.function.subs(var, x), c)
+  if used != puzzle['primitives']: return False, f'Wrong primitives. Used {used}, needed {puzzle["primitives"]}'
+  got, want = complex(answer.evalf()), complex(sympy.sympify(puzzle['target']).evalf())
+  if abs(got - want) <= 1e-9 * max(1, abs(want)): return True, 'Correct!'
+  return False, f'Incorrect (got {got.real:.6g}, want {puzzle["target"]})'
+
+# candidates run speculatively in a Sandbox until SPARES good ones are waiting, refilled from each
+# finished candidate's callback, so the search keeps going while the player answers and generate()
+# returns a spare (or FALLBACK) within GENERATION_BUDGET
+class Generator:
+  def __init__(self, workers=SEARCH_WORKERS, seed=None):
+    from sandbox import Sandbox
+    self.sandbox = Sandbox(workers, CANDIDATE_TIMEOUT, SANDBOX_MEMORY_MB, preload=['sympy', 'calc_puzzle'])
+    self.checker = Sandbox(1, VALIDATION_TIMEOUT, SANDBOX_MEMORY_MB, preload=['sympy', 'calc_puzzle']) # answers never queue behind the search
+    self.threads = ThreadPoolExecutor(workers) # each thread waits on one sandbox call
+    self.workers, self.running, self.spares, self.closed = workers, set(), deque(), False
+    self.seed, self.tried = seeds.root_seed() if seed is None else seed, itertools.count() # candidate i is seeds.derive(seed, i)
+    self.ready = threading.Condition() # guards running/spares/closed, notified when a candidate finishes
+    with self.ready: self.top_up()
+
+  def try_candidate(self, seed):
+    try: return self.sandbox.call(candidate, seed)
+    except Exception: return None # over the limits, or sympy gave up on this F (PolynomialError, RecursionError, ...)
+
+  def top_up(self):
+    """One candidate per worker until SPARES are waiting; call with self.ready held."""
+    while not self.closed and len(self.running) < self.workers and len(self.spares) < SPARES:
+      future = self.threads.submit(self.try_candidate, seeds.derive(self.seed, next(self.tried)))
+      self.running.add(future)
+      future.add_done_callback(self.finished)
+
+  def finished(self, future):
+    with self.ready:
+      self.running.discard(future)
+      if not future.cancelled() and (puzzle := future.result()) and len(self.spares) < SPARES: self.spares.append(puzzle)
+      self.top_up()
+      self.ready.notify_all()
+
+  def generate(self):
+    """A puzzle dict within GENERATION_BUDGET seconds."""
+    with self.ready:
+      self.ready.wait_for(lambda: self.spares, GENERATION_BUDGET)
+      puzzle = self.spares.popleft() if self.spares else FALLBACK
+      self.top_up() # the search may have stopped with SPARES waiting
+    return puzzle
+
+  def check(self, user_input, puzzle):
+    try: return self.checker.call(check, user_input, puzzle)
+    except Exception as e: return False, f'Error: {e}'
+
+  def close(self):
+    with self.ready: self.closed = True # finishing candidates stop resubmitting
+    self.threads.shutdown(wait=False, cancel_futures=True)
+    self.sandbox.close(); self.checker.close()
 
 if __name__ == '__main__':
-  pass
+  import calc_puzzle # workers unpickle candidate/check by module name, not __main__
+  generator = calc_puzzle.Generator()
+  try:
+    while True:
+      st = time.monotonic()
+      puzzle = generator.generate()
+      print(f"\nPrimitives: {puzzle['primitives']} ({time.monotonic() - st:.2f}s)")
+      print(f"Target: {puzzle['target']}")
+      while True:
+        user_input = input('Answer: ').strip()
+        if user_input == 'q': print(f"Answer: Integral({puzzle['integrand']}, (x, 0, {puzzle['bound']}))"); break
+        correct, message = generator.check(user_input, puzzle)
+        print(message)
+        if correct: break
+  except (KeyboardInterrupt, EOFError): print()
+  finally: generator.close()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# hash-consed canonical forms: + - and * / chains flatten into sorted signed multisets,
+# each distinct subexpression gets an id and an order-independent blake2b digest
+# usage: ./canonical.py <bank> [out]   count duplicate solutions, optionally writing the unique ones
+import ast, hashlib, sys
+
+FAMILY = {'+': '+', '-': '+', '*': '*', '/': '*'}
+INVERSE = {'-', '/'}
+AST_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**'}
+
+def parse(expr:str) -> int|tuple:
+  """An expression string as a tuple tree; -x on anything but a number becomes (0 - x)."""
+  def walk(n):
+    if isinstance(n, ast.Constant) and type(n.value) is int: return n.value
+    if isinstance(n, ast.BinOp) and type(n.op) in AST_OPS: return AST_OPS[type(n.op)], walk(n.left), walk(n.right)
+    if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.UAdd): return walk(n.operand)
+    if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.USub):
+      x = walk(n.operand)
+      return -x if isinstance(x, int) else ('-', 0, x)
+    raise ValueError(f'unsupported expression: {ast.unparse(n)}')
+  return walk(ast.parse(expr, mode='eval').body)
+
+def to_tuple(tree) -> int|tuple:
+  if isinstance(tree, (int, tuple)): return tree
+  if isinstance(tree, str): return parse(tree)
+  if hasattr(tree, 'root'): tree = tree[tree.root] # FlatTree
+  return int(tree.val) if tree.is_leaf else (tree.op, to_tuple(tree.left), to_tuple(tree.right))
+
+class Canon:
+  def __init__(self):
+    self.ids = {} # key -> id
+    self.keys = [] # id -> int leaf or (op, ids, ids)
+    self.digests = []
+
+  def __len__(self): return len(self.keys)
+
+  def intern(self, key, digest) -> int:
+    self.ids[key] = len(self.keys)
+    self.keys.append(key); self.digests.append(digest)
+    return len(self.keys) - 1
+
+  def leaf(self, value:int) -> int:
+    i = self.ids.get(value)
+    return self.intern(value, hashlib.blake2b(b'#%d' % value, digest_size=16).digest()) if i is None else i
+
+  def node(self, op:str, pos:list[int], neg:list[int]) -> int:
+    """Interns op over pos (and the inverse over neg); callers sort commutative operands."""
+    key = (op, tuple(pos), tuple(neg))
+    i = self.ids.get(key)
+    if i is not None: return i
+    h = hashlib.blake2b(op.encode(), digest_size=16)
+    for c in pos: h.update(self.digests[c])
+    h.update(b'|')
+    for c in neg: h.update(self.digests[c])
+    return self.intern(key, h.digest())
+
+  def add(self, tree:int|tuple) -> int:
+    """Interns a tuple tree (and all its subexpressions), returns its id."""
+    if isinstance(tree, int): return self.leaf(tree)
+    op, l, r = tree
+    family = FAMILY.get(op)
+    if family is None: return self.node(op, [self.add(l)], [self.add(r)])
+    pos, neg = [], []
+    self.collect(tree, family, False, pos, neg)
+    pos.sort(key=self.digests.__getitem__); neg.sort(key=self.digests.__getitem__)
+    return self.node(family, pos, neg)
+
+  def collect(self, tree, family, flip, pos, neg):
+    if isinstance(tree, int) or FAMILY.get(tree[0]) != family: (neg if flip else pos).append(self.add(tree)); return
+    op, l, r = tree
+    self.collect(l, family, flip, pos, neg)
+    self.collect(r, family, flip != (op in INVERSE), pos, neg)
+
+  def digest(self, tree) -> bytes: return self.digests[self.add(to_tuple(tree))]
+
+  def render(self, i:int) -> str:
+    key = self.keys[i]
+    if isinstance(key, int): return str(key)
+    op, pos, neg = key
+    if op == '**': return f'({self.render(pos[0])} ** {self.render(neg[0])})'
+    inverse = ' - ' if op == '+' else ' / '
+    return '(' + f' {op} '.join(map(self.render, pos)) + ''.join(inverse + self.render(c) for c in neg) + ')'
+
+  def canonical(self, tree) -> str: return self.render(self.add(to_tuple(tree)))
+
+def same(a, b, table:Canon|None=None) -> bool:
+  """Whether two trees/expressions are the same up to reordering and regrouping."""
+  table = Canon() if table is None else table
+  return table.add(to_tuple(a)) == table.add(to_tuple(b))
+
+def dedupe(puzzles, table:Canon|None=None):
+  """Yields the (numbers, target, tree) puzzles whose solution's canonical form is new."""
+  table, seen = Canon() if table is None else table, set()
+  for puzzle in puzzles:
+    d = table.digest(puzzle[2])
+    if d not in seen: seen.add(d); yield puzzle
+
+if __name__ == '__main__':
+  import time
+  from puzzle_bank import Bank, append, index
+  bank, st = Bank(sys.argv[1]), time.time()
+  unique = list(dedupe(bank[i] for i in range(len(bank))))
+  print(f'{len(unique)} unique of {len(bank)} puzzles ({time.time()-st:.2f}s)')
+  if len(sys.argv) > 2:
+    append(sys.argv[2], unique)
+    index(sys.argv[2])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# memoized node/op counts and simplified forms of sympy expressions, per subexpression,
+# in LRUs bounded by total node count
+from collections import OrderedDict
+import sympy
+
+CAPACITY = 1 << 20 # total nodes held per cache
+
+class LRU:
+  def __init__(self, capacity=CAPACITY):
+    self.data, self.size, self.capacity = OrderedDict(), 0, capacity
+    self.hits = self.misses = 0
+
+  def __len__(self): return len(self.data)
+
+  def get(self, key):
+    entry = self.data.get(key)
+    if entry is None: self.misses += 1; return None
+    self.hits += 1
+    self.data.move_to_end(key)
+    return entry[0]
+
+  def put(self, key, value, size):
+    if key in self.data: self.size -= self.data.pop(key)[1]
+    self.data[key] = value, size
+    self.size += size
+    while self.size > self.capacity and len(self.data) > 1: self.size -= self.data.popitem(last=False)[1][1]
+
+class Complexity:
+  def __init__(self, capacity=CAPACITY):
+    self.counts = LRU(capacity) # expr -> (nodes, ops)
+    self.simplified = LRU(capacity) # expr -> simplify()'d expr
+
+  def count(self, expr):
+    """(nodes, ops) of expr."""
+    hit = self.counts.get(expr)
+    if hit: return hit
+    if expr.is_Atom: value = 1, 0
+    else:
+      children = [self.count(a) for a in expr.args]
+      value = 1 + sum(n for n, _ in children), 1 + sum(o for _, o in children)
+    self.counts.put(expr, value, value[0])
+    return value
+
+  def nodes(self, expr): return self.count(expr)[0]
+  def ops(self, expr): return self.count(expr)[1]
+
+  def simplify(self, expr):
+    """simplify() bottom-up, memoized per subexpression."""
+    if expr.is_Atom: return expr
+    hit = self.simplified.get(expr)
+    if hit is not None: return hit
+    value = sympy.simplify(expr.func(*map(self.simplify, expr.args)))
+    self.simplified.put(expr, value, self.nodes(expr) + self.nodes(value))
+    return value
+
+  def opacity(self, raw, target):
+    """(raw nodes - target nodes) / raw nodes: 0 when target gives raw away, 1 when it hides all of it."""
+    n = self.nodes(raw)
+    return (n - self.nodes(target)) / n
+
+  def stats(self):
+    return {name: {'entries': len(c), 'size': c.size, 'hits': c.hits, 'misses': c.misses}
+            for name, c in (('counts', self.counts), ('simplified', self.simplified))}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# expression trees as flat typed arrays in postfix order (children before parents, root last)
+from array import array
+
+OPS = ['+', '-', '*', '/', '**']
+LEAF = -1
+
+def int_apply(op, l, r):
+  """Integer semantics shared by the repair generators: floor division, int(l ** r)."""
+  if op == '+': return l + r
+  if op == '-': return l - r
+  if op == '*': return l * r
+  if op == '/': return l // r
+  return int(l ** r)
+
+class Node:
+  __slots__ = ('tree', 'i')
+  def __init__(self, tree, i): self.tree, self.i = tree, i
+  @property
+  def is_leaf(self): return self.tree.ops[self.i] == LEAF
+  @property
+  def left(self): return None if self.is_leaf else Node(self.tree, self.tree.left[self.i])
+  @property
+  def right(self): return None if self.is_leaf else Node(self.tree, self.tree.right[self.i])
+  @property
+  def op(self): return self.tree.op(self.i)
+  @op.setter
+  def op(self, op): self.tree.set_op(self.i, op)
+  @property
+  def val(self): return self.tree.vals[self.i]
+  @val.setter
+  def val(self, val): self.tree.vals[self.i] = val
+  def __repr__(self): return self.tree.to_str(self.i)
+
+class FlatTree:
+  __slots__ = ('ops', 'left', 'right', 'vals')
+
+  def __init__(self, vals=None):
+    """vals is an int64 array unless given, e.g. a list for values that are Fractions, floats or past int64."""
+    self.ops, self.left, self.right = array('b'), array('I'), array('I')
+    self.vals = array('q') if vals is None else vals
+
+  def add_leaf(self, val=0):
+    self.ops.append(LEAF); self.left.append(0); self.right.append(0); self.vals.append(val)
+    return len(self.ops) - 1
+
+  def add_node(self, op, left, right, val=0):
+    self.ops.append(OPS.index(op)); self.left.append(left); self.right.append(right); self.vals.append(val)
+    return len(self.ops) - 1
+
+  def __len__(self): return len(self.ops)
+  def __iter__(self): return (Node(self, i) for i in range(len(self.ops)))
+  def __getitem__(self, i): return Node(self, i)
+  def __repr__(self): return self.to_str()
+
+  @property
+  def root(self): return len(self.ops) - 1
+  @property
+  def val(self): return self.vals[-1]
+
+  def is_leaf(self, i): return self.ops[i] == LEAF
+  def op(self, i): return None if self.ops[i] == LEAF else OPS[self.ops[i]]
+  def set_op(self, i, op): self.ops[i] = OPS.index(op)
+
+  def start(self, i):
+    """First position of the subtree rooted at i (subtrees are contiguous in postfix)."""
+    while self.ops[i] != LEAF: i = self.left[i]
+    return i
+
+  def leaves(self, i=None):
+    """Leaf values of the subtree at i (default: whole tree), left to right."""
+    i = self.root if i is None else i
+    vals, ops = self.vals, self.ops
+    return [vals[j] for j in range(self.start(i), i + 1) if ops[j] == LEAF]
+
+  def op_codes(self): return [c for c in self.ops if c != LEAF]
+
+  def evaluate(self, apply=int_apply):
+    """Recomputes every internal value bottom-up in place, returns the root value."""
+    ops, left, right, vals = self.ops, self.left, self.right, self.vals
+    for i in range(len(ops)):
+      if ops[i] != LEAF: vals[i] = apply(OPS[ops[i]], vals[left[i]], vals[right[i]])
+    return vals[-1]
+
+  def to_str(self, i=None):
+    i = self.root if i is None else i
+    stack = []
+    for j in range(self.start(i), i + 1):
+      if self.ops[j] == LEAF: stack.append(str(self.vals[j]))
+      else: r = stack.pop(); stack.append(f"({stack.pop()} {OPS[self.ops[j]]} {r})")
+    return stack[0]
+
+class TreeStore:
+  """Many FlatTrees back to back in one set of arrays (child positions stay tree-relative)."""
+  __slots__ = ('ops', 'left', 'right', 'vals', 'starts')
+
+  def __init__(self):
+    self.ops, self.left, self.right, self.vals = array('b'), array('I'), array('I'), array('q')
+    self.starts = array('Q', [0])
+
+  def append(self, tree):
+    self.ops.extend(tree.ops); self.left.extend(tree.left); self.right.extend(tree.right); self.vals.extend(tree.vals)
+    self.starts.append(len(self.ops))
+
+  def __len__(self): return len(self.starts) - 1
+
+  def __getitem__(self, k):
+    a, b = self.starts[k], self.starts[k + 1]
+    tree = FlatTree()
+    tree.ops, tree.left, tree.right, tree.vals = self.ops[a:b], self.left[a:b], self.right[a:b], self.vals[a:b]
+    return tree
@@ -1,41 +1,103 @@
 #!/usr/bin/env python3
 
-import math, random
+import os, random, re, sys
+from collections import Counter
+from fractions import Fraction
 from sympy import parse_expr
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import seeds
+from flat_tree import FlatTree
+from shapes import count, rank, sample
+
 OPS = ['+', '-', '*', '/', '**']
 TARGET_RANGE = [10, 400]
 NUMBER_RANGE = [2, 100]
 NUMBER_COUNT = 4
+MAX_VALUE = 10**6
 VIZ_SAMPLES = 10000
 
-class Node:
-  def __init__(self, is_leaf, val, op, left, right):
-    self.is_leaf = is_leaf
-    self.val = val
-    self.op = op
-    self.left = left
-    self.right = right
-  def __repr__(self): return str(self.val) if self.is_leaf else f"({self.left} {self.op} {self.right})"
+def generate_tree_shape(n=NUMBER_COUNT, rng=random):
+  """Uniformly random tree shape with n leaves (no values or operators yet) and its shape id (rank)."""
+  word = sample(n, rng)
+  tree, stack = FlatTree(vals=[]), [] # values are Fractions
+  for leaf in word: # postfix, so both children are on the stack when their parent comes
+    if leaf: stack.append(tree.add_leaf())
+    else: right = stack.pop(); stack.append(tree.add_node('+', stack.pop(), right)) # operator is drawn in evaluate
+  return tree, rank(word)
 
-def catalan(n:int): return math.comb(2*n, n) // (n+1)
+def evaluate(tree, rng=random):
+  """Fills in random leaves and operators bottom-up, returns the exact value or None if it breaks a limit."""
+  vals = tree.vals
+  for i in range(len(tree)):
+    if tree.is_leaf(i):
+      vals[i] = rng.randint(*NUMBER_RANGE)
+      continue
+    l, r = Fraction(vals[tree.left[i]]), Fraction(vals[tree.right[i]])
+    op = rng.choice(OPS)
+    tree.set_op(i, op)
+    if op == '+': val = l + r
+    elif op == '-': val = l - r
+    elif op == '*': val = l * r
+    elif op == '/':
+      if r == 0: return None
+      val = l / r
+    else:
+      if r.denominator != 1 or not 0 <= r <= 5 or abs(l) > 20: return None # keep powers mental-math sized
+      val = l ** int(r)
+    if abs(val) > MAX_VALUE: return None
+    vals[i] = val
+  return Fraction(vals[-1])
 
-def generate_tree_shape():
-  pass
+def get_leaves(tree): return tree.leaves()
 
-def generate_puzzle():
-  pass
+def generate_puzzle(rng=random):
+  """Returns (root, target, shape id) or None if every retry missed TARGET_RANGE."""
+  for _ in range(100):
+    root, shape = generate_tree_shape(rng=rng)
+    val = evaluate(root, rng)
+    if val is not None and val.denominator == 1 and TARGET_RANGE[0] <= val <= TARGET_RANGE[1]: return root, int(val), shape
+  return None
 
 if os.getenv("VIZ"):
   import matplotlib.pyplot as plt
 
+  shapes, targets = Counter(), []
   for i in range(VIZ_SAMPLES):
-    pass
+    puzzle = generate_puzzle()
+    if puzzle: shapes[puzzle[2]] += 1; targets.append(puzzle[1])
+
+  fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+  ids = range(count(NUMBER_COUNT))
+  ax1.bar(ids, [shapes[i] for i in ids], color='#66B2FF')
+  ax1.set_title("Accepted Puzzles per Shape (shapes are sampled uniformly)")
+  ax1.set_xlabel("Shape id")
+  ax2.hist(targets, bins=50, color='#FFAA33', alpha=0.7)
+  ax2.set_title(f"Target Value Distribution ({TARGET_RANGE})")
+  plt.tight_layout()
+  plt.show()
+  sys.exit(0)
 
 if __name__ == "__main__":
+  # usage: ./arithmetic_compose.py [puzzle id], puzzles then carry on from that one
+  seed, index = seeds.parse_id(sys.argv[1]) if len(sys.argv) > 1 else (seeds.root_seed(), 0)
   while True:
-    puzzle = generate_puzzle()
-    if not puzzle: continue
+    root, target, shape = seeds.at(generate_puzzle, seed, index)
+    leaves = sorted(get_leaves(root))
+    print(f"\nPuzzle:  {seeds.format_id(seed, index)}")
+    print(f"Target:  {target} (shape #{shape})")
+    print(f"Numbers: {leaves}")
 
     while True:
-      user_input = input("Expression: ").strip()
\ No newline at end of file
+      try: user_input = input("Expression: ").strip()
+      except (KeyboardInterrupt, EOFError): print(); sys.exit(0)
+      if user_input == 'q': print(f"Solution: {root}"); break
+      if not user_input: continue
+      try:
+        user_nums = sorted(int(x) for x in re.findall(r'\d+', user_input))
+        if user_nums != leaves: print(f"Wrong numbers! Used: {user_nums}"); continue
+        result = parse_expr(user_input)
+        if result == target: print("Correct!"); break
+        print(f"Incorrect. Result: {result}")
+      except Exception as e: print(f"Error: {e}")
+    index += 1
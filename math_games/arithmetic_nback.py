@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# n-back arithmetic: answer the problem n before the one shown
+# usage: ./arithmetic_nback.py [n] [--pace SECONDS] [--duration SECONDS]
+
+import argparse, operator, os, random, sys, time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import seeds, zetamac
+from session import Session
+from telemetry import Telemetry
+
+N = 2
+DURATION = 120
+BATCH = 256
+LAG_SAMPLES = 4096
+OPS = list(zetamac.OPS)
+APPLY = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.floordiv, '**': operator.pow}
+
+class Stream:
+  def __init__(self, n, batch=BATCH, rng=random):
+    self.n, self.batch, self.i, self.rng = n, batch, 0, rng
+    self.ops, self.answers, self.problems, self.prompts = self.fill()
+    self.spare = None
+
+  def fill(self):
+    ops, answers, problems, prompts = array('B', bytes(self.batch)), array('q', bytes(8 * self.batch)), [None] * self.batch, [None] * self.batch
+    for j in range(self.batch):
+      code = self.rng.randrange(len(OPS))
+      op = OPS[code]
+      a, b = zetamac.OPS[op](self.rng)
+      if op == '/': a *= b
+      ops[j], answers[j], problems[j] = code, APPLY[op](a, b), f'{a} {op} {b}'.ljust(14)
+      prompts[j] = problems[j] + f'[{self.n} back] = '
+    return ops, answers, problems, prompts
+
+  def prefetch(self):
+    """Fills the next batch if it isn't yet; call it while waiting on the player."""
+    if self.spare is None: self.spare = self.fill()
+
+  def next(self):
+    """Index of the next problem in ops/answers/problems/prompts."""
+    if self.i == self.batch:
+      self.ops, self.answers, self.problems, self.prompts = self.spare or self.fill()
+      self.spare, self.i = None, 0
+    self.i += 1
+    return self.i - 1
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('n', type=int, nargs='?', default=N)
+  parser.add_argument('--pace', type=float, help='seconds per answer')
+  parser.add_argument('--duration', type=float, default=DURATION)
+  args = parser.parse_args()
+  n, pace = args.n, args.pace
+
+  stream = Stream(n, rng=seeds.from_env()) # SEED=<seed> replays a session's problems
+  due, due_op = array('q', bytes(8 * n)), array('B', bytes(n)) # ring: problem k's answer sits in slot k % n until k + n
+  lag, lags = array('q', bytes(8 * LAG_SAMPLES)), 0
+  score = wrong = k = 0
+  telemetry = Telemetry(f'nback{n}', os.getenv('TELEMETRY')) # TELEMETRY=<path> appends every answer to a log
+  print(f'Remember each problem, answer the one {n} back. The first {n} are free.')
+  session = Session(args.duration) # ends the session mid-question, exactly --duration seconds in
+  returned = None
+  try:
+    while True:
+      j, slot = stream.next(), k % n
+      if returned is not None: lag[lags % LAG_SAMPLES] = time.perf_counter_ns() - returned; lags += 1
+      telemetry.ask()
+      if k < n: session.input(stream.problems[j] + '(enter) '); returned = time.perf_counter_ns() # nothing due yet
+      else:
+        sys.stdout.write(stream.prompts[j]); sys.stdout.flush()
+        stream.prefetch() # the player is reading the problem now
+        line = session.input('', pace)
+        returned = time.perf_counter_ns()
+        if line is None: print('Too slow'); wrong += 1; telemetry.answer(OPS[due_op[slot]], answered=False)
+        elif zetamac.check(line, due[slot]): score += 1; telemetry.answer(OPS[due_op[slot]])
+        else:
+          wrong += 1; telemetry.miss(); telemetry.answer(OPS[due_op[slot]])
+          print(f'Was {due[slot]}')
+      due[slot], due_op[slot] = stream.answers[j], stream.ops[j]
+      k += 1
+  except (KeyboardInterrupt, EOFError, TimeoutError): pass
+  session.close()
+  print(f'\nScore: {score}, wrong: {wrong}')
+  if lags:
+    s = sorted(lag[:min(lags, LAG_SAMPLES)])
+    print(f'lag p50 {s[len(s) // 2] / 1e3:.1f}us, p99 {s[min(len(s) - 1, len(s) * 99 // 100)] / 1e3:.1f}us, max {s[-1] / 1e3:.1f}us')
+  telemetry.close()
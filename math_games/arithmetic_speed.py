@@ -1,33 +1,39 @@
 #!/usr/bin/env python3
 
-import random, readline, threading
+import os, random, sys
 
-def make_pow():
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import seeds
+from session import Session
+from telemetry import Telemetry
+
+def make_pow(rng=random):
   while True:
     return None
 
 OPS = {
-  '+': lambda: (random.randint(2,1000), random.randint(2,1000)),
-  '-': lambda: (random.randint(2,1000), random.randint(2,1000)),
-  '*': lambda: (random.randint(2,100),  random.randint(2,20)),
-  '/': lambda: (random.randint(2,2000), random.randint(2,20)),
+  '+': lambda rng=random: (rng.randint(2,1000), rng.randint(2,1000)),
+  '-': lambda rng=random: (rng.randint(2,1000), rng.randint(2,1000)),
+  '*': lambda rng=random: (rng.randint(2,100),  rng.randint(2,20)),
+  '/': lambda rng=random: (rng.randint(2,2000), rng.randint(2,20)),
   '**': make_pow,
 }
 MAX_ERROR = 0.01
 DURATION = 5
 
 if __name__ == '__main__':
-  score = 0
-  running = threading.Event(); running.set()
-  timer = threading.Timer(DURATION, running.clear); timer.start()
+  score, rng = 0, seeds.from_env() # SEED=<seed> replays a session's questions
+  telemetry = Telemetry('arith', os.getenv('TELEMETRY')) # TELEMETRY=<path> appends every question to a log
+  session = Session(DURATION) # ends the session mid-question, exactly DURATION seconds in
   try:
-    while running.is_set():
-      op = random.choice(list(OPS))
-      a, b = OPS[op]()
+    while True:
+      op = rng.choice(list(OPS))
+      a, b = OPS[op](rng)
       exact = eval(f'{a} {op} {b}')
       parse = float if isinstance(exact, float) else int
+      telemetry.ask()
       while True:
-        try: ans = parse(input(f'{a} {op} {b} = '))
+        try: ans = parse(session.input(f'{a} {op} {b} = '))
         except ValueError: continue
         rel_error = (ans - exact) / exact
         if isinstance(exact,float) and rel_error <= MAX_ERROR:
@@ -35,7 +41,11 @@ if __name__ == '__main__':
           break
         elif ans == exact:
           break
+        telemetry.miss()
+      telemetry.answer(op)
       score += 1
       print(f'Score: {score}')
-  except (KeyboardInterrupt, EOFError): timer.cancel()
+  except (KeyboardInterrupt, EOFError, TimeoutError): telemetry.answer(op, answered=False)
+  session.close()
   print(f'\nAnswer: {exact}')
+  telemetry.close()
@@ -1,89 +1,101 @@
 #!/usr/bin/env python3
 
-import math, os, random, sys, time
-from collections import Counter
+import math, os, random, re, sys, time
 
 OPS = ['+', '-', '*', '/', '**']
 TARGET_RANGE = [10, 400]
 NUMBER_RANGE = [2, 100]
 NUMBER_COUNT = 5
 VIZ_SAMPLE_SIZE = 20000
+VIZ_REFRESH = 2000
+PREFETCH_DEPTH = 8 # puzzles kept ready
+PREFETCH_REFILL = 2 # top the queue up again at this many
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flat_tree import FlatTree, LEAF
+ADD = OPS.index('+')
+
+def generate_skeleton(n, tree=None, rng=random):
+  """Generates a random binary tree structure (appended to tree in postfix order)."""
+  if tree is None: tree = FlatTree(vals=[]) # values can be floats (/ and negative powers) or past int64
+  if n == 1:
+    tree.add_leaf()
+    return tree
+  split = rng.randint(1, n-1) if n > 2 else 1
+  op = rng.choice(OPS)
+  left = generate_skeleton(split, tree, rng).root
+  right = generate_skeleton(n-split, tree, rng).root
+  tree.add_node(op, left, right)
+  return tree
+
+def evaluate_and_repair(tree, rng=random):
+  """Bottom-up pass (postfix order) that forces values to satisfy operator constraints."""
+  ops, lefts, rights, vals = tree.ops, tree.left, tree.right, tree.vals
+  for i in range(len(ops)):
+    if ops[i] == LEAF:
+      vals[i] = rng.randint(*NUMBER_RANGE)
+      continue
+
+    left, right = lefts[i], rights[i]
+    l_val, r_val = vals[left], vals[right]
+    op = OPS[ops[i]]
+
+    # --- Constraint Logic (Polynomial Time) ---
+    if op == '/':
+      if r_val == 0:
+        r_val = 1
+        vals[right] = 1
+      if l_val % r_val != 0:
+        multiplier = rng.randint(1, 15)  # Keep small to avoid explosion
+        l_val = r_val * multiplier
+        vals[left] = l_val
+    elif op == '**':
+      if abs(l_val) > 20 and abs(r_val) > 1:
+        r_val = 1
+        vals[right] = 1
+      elif abs(l_val) > 5 and abs(r_val) > 2:
+        r_val = rng.randint(0, 2)
+        vals[right] = r_val
+      if abs(r_val) > 5:
+        l_val = rng.randint(0, 2)
+        vals[left] = l_val
+      try:
+        res = l_val ** r_val
+        if isinstance(res, complex) or abs(res) > 200000:
+          op = '+'
+          ops[i] = ADD
+      except:
+        op = '+'
+        ops[i] = ADD
 
-class Node:
-  def __init__(self, val=None, op=None, left=None, right=None, is_leaf=False):
-    self.val = val
-    self.op = op
-    self.left = left
-    self.right = right
-    self.is_leaf = is_leaf
-  def __repr__(self): return str(self.val) if self.is_leaf else f"({self.left} {self.op} {self.right})"
-
-def generate_skeleton(n):
-  """Generates a random binary tree structure."""
-  if n == 1: return Node(is_leaf=True)
-  split = random.randint(1, n-1) if n > 2 else 1
-  return Node(op=random.choice(OPS), left=generate_skeleton(split), right=generate_skeleton(n-split))
-
-def evaluate_and_repair(node):
-  """Bottom-up traversal that forces values to satisfy operator constraints."""
-  if node.is_leaf:
-    node.val = random.randint(*NUMBER_RANGE)
-    return node.val
-
-  l_val = evaluate_and_repair(node.left)
-  r_val = evaluate_and_repair(node.right)
-  op = node.op
-
-  # --- Constraint Logic (Polynomial Time) ---
-  if op == '/':
-    if r_val == 0:
-      r_val = 1
-      node.right.val = 1
-    if l_val % r_val != 0:
-      multiplier = random.randint(1, 15)  # Keep small to avoid explosion
-      l_val = r_val * multiplier
-      node.left.val = l_val
-  elif op == '**':
-    if abs(l_val) > 20 and abs(r_val) > 1:
-      r_val = 1
-      node.right.val = 1
-    elif abs(l_val) > 5 and abs(r_val) > 2:
-      r_val = random.randint(0, 2)
-      node.right.val = r_val
-    if abs(r_val) > 5:
-      l_val = random.randint(0, 2)
-      node.left.val = l_val
+    # --- Calculation ---
     try:
-      res = l_val ** r_val
-      if isinstance(res, complex) or abs(res) > 200000:
-        op = '+'
-        node.op = '+'
+      if op == '+':    res = l_val + r_val
+      elif op == '-':  res = l_val - r_val
+      elif op == '*':  res = l_val * r_val
+      elif op == '/':  res = l_val / r_val
+      elif op == '**': res = l_val ** r_val
     except:
-      op = '+'
-      node.op = '+'
-
-  # --- Calculation ---
-  try:
-    if op == '+':    res = l_val + r_val
-    elif op == '-':  res = l_val - r_val
-    elif op == '*':  res = l_val * r_val
-    elif op == '/':  res = l_val / r_val
-    elif op == '**': res = l_val ** r_val
-  except:
-    res = 0  # Fallback for div by zero or overflow
-
-  node.val = res
-  return res
-
-def get_leaves(node):
-  if node.is_leaf: return [node.val]
-  return get_leaves(node.left) + get_leaves(node.right)
-
-def generate_puzzle():
+      res = 0  # Fallback for div by zero or overflow
+
+    vals[i] = res
+  return vals[-1]
+
+def get_leaves(tree): return tree.leaves()
+
+def judge(user_in, leaves, target):
+  """(correct, message) for a formula using the sorted leaves."""
+  if not re.match(r'^[\d\s\+\-\*\/\(\)\.]+$', user_in) and "**" not in user_in: return False, "Invalid characters."
+  user_nums = sorted([int(x) for x in re.findall(r'\d+', user_in)])
+  if user_nums != leaves: return False, f"Wrong numbers! Used: {user_nums}"
+  res = eval(user_in)
+  return res == target, f"Correct! ({res})" if res == target else f"Incorrect. Result: {res}"
+
+def generate_puzzle(rng=random):
   """Generates a single valid puzzle instance."""
   for _ in range(100):
-    root = generate_skeleton(NUMBER_COUNT)
-    res = evaluate_and_repair(root)
+    root = generate_skeleton(NUMBER_COUNT, rng=rng)
+    res = evaluate_and_repair(root, rng)
     if TARGET_RANGE[0] <= res <= TARGET_RANGE[1]: return root, res
   return None
 
@@ -92,79 +104,99 @@ if os.getenv("VIZ"):
   import matplotlib.pyplot as plt
   print(f"--- ANALYZING (Samples: {VIZ_SAMPLE_SIZE}, Range: {NUMBER_RANGE}) ---")
 
-  ops_cnt = Counter()
-  leaf_vals = []
-  targets = []
+  from streaming_stats import LivePlot, SampleStats
 
-  def walk_stats(n):
-    if n.is_leaf: leaf_vals.append(n.val)
-    else:
-      ops_cnt[n.op] += 1
-      walk_stats(n.left)
-      walk_stats(n.right)
+  stats = SampleStats([0, 103], TARGET_RANGE, target_bins=50) # leaf bins match range(0, 105)
+
+  def walk_stats(tree):
+    for op, val in zip(tree.ops, tree.vals):
+      if op == LEAF: stats.leaves.add(val)
+      else: stats.ops[OPS[op]] += 1
+
+  def draw(axes, stats):
+    ax1, ax2, ax3 = axes
+    ax1.bar(stats.ops.keys(), stats.ops.values(), color='#66B2FF')
+    ax1.set_title("Operator Frequency")
+
+    ax2.stairs(stats.leaves.counts, stats.leaves.edges(), fill=True, color='#55AA55', alpha=0.7)
+    ax2.set_title(f"Leaf Value Distribution (Min: {NUMBER_RANGE[0]})")
+    ax2.set_xlabel("Value")
+
+    ax3.stairs(stats.targets.counts, stats.targets.edges(), fill=True, color='#FFAA33', alpha=0.7)
+    ax3.set_title(f"Target Value Distribution ({TARGET_RANGE})")
+
+  # LIVE=1 redraws every VIZ_REFRESH samples, SNAPSHOT=<path> keeps a JSON copy of the tallies
+  live = LivePlot(draw, figsize=(18, 5)) if os.getenv("LIVE") else None
+  snapshot = os.getenv("SNAPSHOT")
 
   st = time.time()
-  generated = 0
-  while generated < VIZ_SAMPLE_SIZE:
+  while stats.samples < VIZ_SAMPLE_SIZE:
     p = generate_puzzle()
     if p:
-      targets.append(p[1])
+      stats.add_target(p[1])
       walk_stats(p[0])
-      generated += 1
+      if stats.samples % VIZ_REFRESH == 0:
+        if live: live.update(stats)
+        if snapshot: stats.snapshot(snapshot)
 
   print(f"Generated {VIZ_SAMPLE_SIZE} samples in {time.time()-st:.2f}s")
 
-  fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(18, 5))
-
-  ax1.bar(ops_cnt.keys(), ops_cnt.values(), color='#66B2FF')
-  ax1.set_title("Operator Frequency")
-
-  ax2.hist(leaf_vals, bins=range(0, 105), color='#55AA55', alpha=0.7)
-  ax2.set_title(f"Leaf Value Distribution (Min: {NUMBER_RANGE[0]})")
-  ax2.set_xlabel("Value")
-
-  ax3.hist(targets, bins=50, color='#FFAA33', alpha=0.7)
-  ax3.set_title(f"Target Value Distribution ({TARGET_RANGE})")
-
-  plt.tight_layout()
-  plt.show()
+  if live:
+    live.update(stats)
+    live.show()
+  else:
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    draw(axes, stats)
+    plt.tight_layout()
+    plt.show()
   sys.exit(0)
 
 # --- Game Mode ---
 if __name__ == "__main__":
-  import re
+  # usage: ./old.py [puzzle id], puzzles then carry on from that one
   print(f"Generative Arithmetic Game (Range: {NUMBER_RANGE})")
   print("Press 'q' to reveal solution, 'n' for next, or Ctrl+C to exit.")
 
-  while True:
-    p = generate_puzzle()
-    if not p: continue
+  import atexit, itertools
+  import seeds
+  seed, start = seeds.parse_id(sys.argv[1]) if len(sys.argv) > 1 else (seeds.root_seed(), 0)
+  bank = None
+  if os.getenv("BANK"): # pre-generated puzzles, see ../puzzle_bank.py
+    from puzzle_bank import Bank
+    from twentyfour import render
+    bank = Bank(os.getenv("BANK"))
+    if NUMBER_COUNT not in bank.counts: sys.exit(f"{os.getenv('BANK')} has no {NUMBER_COUNT}-number puzzles")
+  else: # generate the next puzzles in the background while the player is typing
+    from prefetch import Prefetcher
+    indices = itertools.count(start) # only the prefetch thread advances it
+    prefetcher = Prefetcher(lambda: (i := next(indices), seeds.at(generate_puzzle, seed, i)), PREFETCH_DEPTH, PREFETCH_REFILL)
+    atexit.register(prefetcher.close)
 
-    root, target = p
-    leaves = sorted(get_leaves(root))
+  while True:
+    if bank:
+      leaves, target, tree = bank.sample(NUMBER_COUNT)
+      root, leaves = render(tree), sorted(leaves)
+    else:
+      try: index, (root, target) = prefetcher.get()
+      except KeyboardInterrupt: print(); sys.exit(0) # Ctrl+C while a puzzle is still being generated
+      leaves = sorted(get_leaves(root))
 
-    print(f"\nTarget:  {target}")
+    print()
+    if not bank: print(f"Puzzle:  {seeds.format_id(seed, index)}")
+    print(f"Target:  {target}")
     print(f"Numbers: {leaves}")
 
     while True:
-      user_in = input("Formula > ").strip()
+      try: user_in = input("Formula > ").strip()
+      except (KeyboardInterrupt, EOFError): print(); sys.exit(0) # atexit stops the prefetcher
 
       if user_in.lower() == 'q': print(f"Solution: {root}"); break
       if user_in.lower() == 'n': break
       if not user_in: continue
 
       try:
-        if not re.match(r'^[\d\s\+\-\*\/\(\)\.]+$', user_in) and "**" not in user_in:
-          print("Invalid characters.")
-          continue
-
-        user_nums = sorted([int(x) for x in re.findall(r'\d+', user_in)])
-        if user_nums != leaves:
-          print(f"Wrong numbers! Used: {user_nums}")
-          continue
-
-        res = eval(user_in)
-        if res == target: print(f"Correct! ({res})"); break
-        else: print(f"Incorrect. Result: {res}")
+        correct, message = judge(user_in, leaves, target)
+        print(message)
+        if correct: break
       except Exception as e:
         print(f"Error: {e}")
\ No newline at end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# small matrix and tensor mental math against the clock, answers typed row by row
+
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import seeds
+from session import Session
+from telemetry import Telemetry
+
+DURATION = 120
+BATCH = 512
+MAX_DET = 50
+MAX_ENTRY = 9
+
+rng = np.random.default_rng(seeds.root_seed()) # SEED=<seed> replays a session's problems
+
+def rejection(draw, keep, count):
+  """count rows of draw(m) (arrays stacked on axis 0) passing keep(*arrays)."""
+  parts, have = [], 0
+  while have < count:
+    arrays = draw(2 * (count - have))
+    mask = keep(*arrays)
+    parts.append([a[mask] for a in arrays])
+    have += int(mask.sum())
+  return [np.concatenate(p)[:count] for p in zip(*parts)]
+
+def grid(m):
+  """Rows of a matrix (a vector as one row) as equal width strings."""
+  m = np.atleast_2d(m)
+  w = max(len(str(v)) for v in m.flat)
+  return ['[' + ' '.join(str(v).rjust(w) for v in row) + ']' for row in m]
+
+def render(*parts):
+  """Arrays (drawn with grid) and labels side by side, labels on the middle row."""
+  cols = [grid(p) if isinstance(p, np.ndarray) else [p] for p in parts]
+  height = max(map(len, cols))
+  lines = [[] for _ in range(height)]
+  for col in cols:
+    top, width = (height - len(col)) // 2, len(col[0])
+    for i in range(height): lines[i].append(col[i - top] if 0 <= i - top < len(col) else ' ' * width)
+  return '\n'.join(' '.join(line).rstrip() for line in lines)
+
+def make_dot(n):
+  def make(count):
+    u, v = rng.integers(-9, 10, (2, count, n))
+    return [render(a, '·', b) for a, b in zip(u, v)], np.einsum('ni,ni->n', u, v)[:, None]
+  return make
+
+def make_matmul2(count):
+  A, B = rng.integers(-5, 6, (2, count, 2, 2))
+  return [render(a, '@', b) for a, b in zip(A, B)], (A @ B).reshape(count, 4)
+
+def make_trace3(count):
+  A, B = rng.integers(-3, 4, (2, count, 3, 3))
+  return [render('tr', a, '@', b) for a, b in zip(A, B)], np.einsum('nij,nji->n', A, B)[:, None]
+
+def make_det(n, high):
+  def make(count):
+    def draw(m):
+      A = rng.integers(-high, high + 1, (m, n, n))
+      return A, np.rint(np.linalg.det(A)).astype(np.int64)
+    A, d = rejection(draw, lambda A, d: np.abs(d) <= MAX_DET, count)
+    return [render('det', a) for a in A], d[:, None]
+  return make
+
+def make_inv2(count):
+  def draw(m):
+    L, U = np.tile(np.eye(2, dtype=np.int64), (2, m, 1, 1))
+    L[:, 1, 0], U[:, 0, 1] = rng.integers(-3, 4, (2, m))
+    P = np.eye(2, dtype=np.int64)[rng.permuted(np.tile(np.arange(2), (m, 1)), axis=1)] * rng.choice([-1, 1], (m, 2, 1))
+    A = P @ L @ U
+    return A, np.rint(np.linalg.inv(A)).astype(np.int64)
+  A, inv = rejection(draw, lambda A, inv: (np.abs(A).max((1, 2)) <= MAX_ENTRY) & (np.abs(inv).max((1, 2)) <= MAX_ENTRY), count)
+  return [render('inv', a, '(4 numbers)') for a in A], inv.reshape(count, 4)
+
+def make_einsum3(count):
+  T = rng.integers(-3, 4, (count, 3, 3, 3))
+  u, v, w = rng.integers(0, 2, (3, count, 3))
+  return ([render('T_ijk u_i v_j w_k, T[:,:,k] =', t[..., 0], t[..., 1], t[..., 2], ' u', a, ' v', b, ' w', c) for t, a, b, c in zip(T, u, v, w)],
+          np.einsum('nijk,ni,nj,nk->n', T, u, v, w)[:, None])
+
+KINDS = {
+  'dot3'   : make_dot(3),
+  'dot4'   : make_dot(4),
+  'matmul2': make_matmul2,
+  'trace3' : make_trace3,
+  'det2'   : make_det(2, 9),
+  'det3'   : make_det(3, 5),
+  'det4'   : make_det(4, 3),
+  'inv2'   : make_inv2,
+  'einsum3': make_einsum3,
+}
+
+def make_batch(size=BATCH):
+  """[(kind, prompt, exact answer as a flat int array)] in random order."""
+  counts = np.bincount(rng.integers(len(KINDS), size=size), minlength=len(KINDS))
+  batch = []
+  for (name, make), count in zip(KINDS.items(), counts):
+    if count: prompts, answers = make(int(count)); batch += zip([name] * int(count), prompts, answers)
+  return [batch[i] for i in rng.permutation(len(batch))]
+
+class Stream:
+  def __init__(self): self.batch, self.spare = make_batch(), None
+
+  def prefetch(self):
+    """Makes the next batch if it isn't yet; call it while waiting on the player."""
+    if self.spare is None: self.spare = make_batch()
+
+  def next(self):
+    if not self.batch: self.batch, self.spare = self.spare or make_batch(), None
+    return self.batch.pop()
+
+def check(line, exact):
+  """Whether the numbers in line are exact, None if they aren't all integers or there are too few/many."""
+  try: got = np.array(line.replace(',', ' ').replace(';', ' ').split(), dtype=np.int64)
+  except ValueError: return None
+  if got.shape != exact.shape: return None
+  return bool(np.array_equal(got, exact))
+
+if __name__ == '__main__':
+  score = 0
+  stream = Stream()
+  telemetry = Telemetry('tensor', os.getenv('TELEMETRY')) # TELEMETRY=<path> appends every question to a log
+  session = Session(DURATION) # ends the session mid-question, exactly DURATION seconds in
+  try:
+    while True:
+      kind, prompt, exact = stream.next()
+      telemetry.ask()
+      print(f'\n{prompt}', flush=True)
+      stream.prefetch() # the player is reading the problem now
+      while True:
+        correct = check(session.input('= '), exact)
+        if correct: break
+        if correct is False: telemetry.miss()
+      telemetry.answer(kind)
+      score += 1
+      print(f'Score: {score}')
+  except (KeyboardInterrupt, EOFError, TimeoutError): telemetry.answer(kind, answered=False)
+  session.close()
+  print(f'\nAnswer: {" ".join(map(str, exact))}')
+  telemetry.close()
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 
-import math, random, readline, threading
+import math, os, random, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import seeds
+from session import Session
+from telemetry import Telemetry
 
 DURATION = 120
 MAX_ERROR = 0.1
@@ -8,45 +13,45 @@ MAX_ERROR = 0.1
 def rel_error(ans, exact):
   return abs(ans - exact) / (abs(exact) or 1)
 
-def make_exp():
-  x = random.uniform(-5,5)
+def make_exp(rng=random):
+  x = rng.uniform(-5,5)
   return f'e^{x:.2f} = ', math.exp(x)
 
-def make_pow():
+def make_pow(rng=random):
   while True:
-    a, x = random.randint(2,20), round(random.uniform(2,10),2)
+    a, x = rng.randint(2,20), round(rng.uniform(2,10),2)
     if a**x <= 1e6: return f'{a}^{x} = ', a**x
 
-def make_ln():
-  x = random.randint(2,1000)
+def make_ln(rng=random):
+  x = rng.randint(2,1000)
   return f'ln({x}) = ', math.log(x)
 
-def make_log():
-  b, x = random.randint(2,10), random.randint(2,1000)
+def make_log(rng=random):
+  b, x = rng.randint(2,10), rng.randint(2,1000)
   return f'log{b}({x}) = ', math.log(x) / math.log(b)
 
-def make_sin():
-  x_deg = random.randint(0,90)
+def make_sin(rng=random):
+  x_deg = rng.randint(0,90)
   return f'sin({x_deg}°) = ', math.sin(math.radians(x_deg))
 
-def make_cos():
-  x_deg = random.randint(0,90)
+def make_cos(rng=random):
+  x_deg = rng.randint(0,90)
   return f'cos({x_deg}°) = ', math.cos(math.radians(x_deg))
 
-def make_tan():
-  x_deg = random.randint(0,80)
+def make_tan(rng=random):
+  x_deg = rng.randint(0,80)
   return f'tan({x_deg}°) = ', math.tan(math.radians(x_deg))
 
-def make_asin():
-  x = round(random.uniform(0,1),2)
+def make_asin(rng=random):
+  x = round(rng.uniform(0,1),2)
   return f'asin({x}) = ', math.degrees(math.asin(x))
 
-def make_acos():
-  x = round(random.uniform(0,1),2)
+def make_acos(rng=random):
+  x = round(rng.uniform(0,1),2)
   return f'acos({x}) = ', math.degrees(math.acos(x))
 
-def make_atan():
-  x = round(random.uniform(0,5),2)
+def make_atan(rng=random):
+  x = round(rng.uniform(0,5),2)
   return f'atan({x}) = ', math.degrees(math.atan(x))
 
 FUNCTIONS = {
@@ -62,20 +67,34 @@ FUNCTIONS = {
   #'atan'  : make_atan,
 }
 
+def new_question(rng=random):
+  name = rng.choice(list(FUNCTIONS.keys()))
+  prompt, exact = FUNCTIONS[name](rng)
+  return name, prompt, exact
+
+def check(line, exact):
+  """Whether the answer in line is within MAX_ERROR, None if it isn't a number."""
+  try: return rel_error(float(line), exact) <= MAX_ERROR
+  except ValueError: return None
+
 if __name__ == '__main__':
-  score = 0
-  running = threading.Event(); running.set()
-  timer = threading.Timer(DURATION, running.clear); timer.start()
+  score, rng = 0, seeds.from_env() # SEED=<seed> replays a session's questions
+  telemetry = Telemetry('trans', os.getenv('TELEMETRY')) # TELEMETRY=<path> appends every question to a log
+  session = Session(DURATION) # ends the session mid-question, exactly DURATION seconds in
   try:
-    while running.is_set():
-      name = random.choice(list(FUNCTIONS.keys()))
-      prompt, exact = FUNCTIONS[name]()
-      ans = None
-      while ans is None or rel_error(ans, exact) > MAX_ERROR:
-        try: ans = float(input(prompt))
-        except ValueError: continue
+    while True:
+      name, prompt, exact = new_question(rng)
+      telemetry.ask()
+      while True:
+        line = session.input(prompt)
+        correct = check(line, exact)
+        if correct: ans = float(line); break
+        if correct is False: telemetry.miss()
+      telemetry.answer(name)
       score += 1
       print(f'Exact: {round(exact,2)} ({round(rel_error(ans,exact)*100, 2)}% error)')
       print(f'Score: {score}')
-  except (KeyboardInterrupt, EOFError): timer.cancel()
+  except (KeyboardInterrupt, EOFError, TimeoutError): telemetry.answer(name, answered=False)
+  session.close()
   print(f'\nAnswer: {exact}')
+  telemetry.close()
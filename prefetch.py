@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# a background thread keeping a bounded queue of ready puzzles topped up
+import queue, threading
+
+class Prefetcher:
+  def __init__(self, generate, depth=8, refill=2):
+    assert 0 <= refill < depth
+    self.generate, self.refill = generate, refill
+    self.queue = queue.Queue(depth)
+    self.stop, self.wake = threading.Event(), threading.Event()
+    self.wake.set()
+    self.thread = threading.Thread(target=self.run, name='prefetch', daemon=True)
+    self.thread.start()
+
+  def run(self):
+    while self.wake.wait() and not self.stop.is_set():
+      while not self.queue.full() and not self.stop.is_set():
+        try: item = self.generate()
+        except BaseException as e: self.queue.put(Failed(e)); return
+        if item is not None: self.queue.put(item) # the only producer, so this never blocks
+      self.wake.clear()
+      if self.queue.qsize() <= self.refill: self.wake.set() # a get() raced the clear
+
+  def get(self):
+    item = self.queue.get()
+    if self.queue.qsize() <= self.refill: self.wake.set()
+    if isinstance(item, Failed): raise item.error
+    return item
+
+  def close(self):
+    self.stop.set(); self.wake.set()
+    self.thread.join(timeout=1)
+
+  def __enter__(self): return self
+  def __exit__(self, *a): self.close()
+
+class Failed:
+  __slots__ = ('error',)
+  def __init__(self, error): self.error = error
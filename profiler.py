@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# opt-in counters and timings keyed by '/'-separated stage names
+# PROFILE=<path> writes a JSON summary at exit (PROFILE_EVERY=<s> also periodically), PROFILE=- prints it
+import atexit, json, multiprocessing, os, sys, time
+from collections import Counter
+
+class Profile:
+  def __init__(self):
+    self.counts, self.ns = Counter(), Counter()
+    self.last = None # set by instrumented code to hand a rejection reason up to its caller
+
+  def count(self, key, n=1): self.counts[key] += n
+
+  def add(self, key, start_ns):
+    """Counts key once and charges it the time since start_ns (from time.perf_counter_ns())."""
+    self.add_ns(key, time.perf_counter_ns() - start_ns)
+
+  def add_ns(self, key, ns):
+    self.counts[key] += 1
+    self.ns[key] += ns
+
+  def summary(self):
+    counts, times = dict(self.counts), dict(self.ns) # copies are atomic, the generator thread may be counting
+    out = {}
+    for key in sorted(counts):
+      n, ns = counts[key], times.get(key)
+      out[key] = {'count': n} if ns is None else {'count': n, 'total_ms': ns / 1e6, 'mean_us': ns / n / 1e3}
+    return out
+
+  def dump(self, path):
+    if path == '-': json.dump(self.summary(), sys.stderr, indent=2); print(file=sys.stderr); return
+    with open(path + '.tmp', 'w') as f: json.dump(self.summary(), f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def from_env():
+  """A Profile that dumps itself at exit if PROFILE is set, otherwise None."""
+  path = os.getenv('PROFILE')
+  if not path or multiprocessing.parent_process(): return None # worker processes would overwrite the parent's dump
+  profile = Profile()
+  atexit.register(profile.dump, path)
+  if os.getenv('PROFILE_EVERY') and path != '-':
+    import threading
+    every = float(os.getenv('PROFILE_EVERY'))
+    def loop():
+      while True: time.sleep(every); profile.dump(path)
+    threading.Thread(target=loop, name='profile-dump', daemon=True).start()
+  return profile
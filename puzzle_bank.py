@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# offline puzzle bank: fixed-size records in <path>, a (count, target) index in <path>.idx
+# usage: [SEED=<seed>] ./puzzle_bank.py build <path> <puzzles> (puzzles 0..n-1 of SEED, a fresh seed by default)
+#        ./puzzle_bank.py index <path>
+import mmap, os, random, struct, sys, time
+from collections import Counter
+import seeds, twentyfour
+from twentyfour import OPS
+
+MAX_NUMBERS = 8
+LEAF = 0xFF
+RECORD = struct.Struct(f'<Bi{MAX_NUMBERS}H{2*MAX_NUMBERS-1}B')
+KEY = struct.Struct('<Bi')
+HEADER = struct.Struct('<QI')
+ENTRY = struct.Struct('<BiQQ')
+ID = struct.Struct('<I')
+
+def encode(target:int, tree:int|tuple) -> bytes:
+  numbers, code = [], []
+  def walk(t):
+    if isinstance(t, int): numbers.append(t); code.append(LEAF); return
+    walk(t[1]); walk(t[2]); code.append(OPS.index(t[0]) + 1)
+  walk(tree)
+  pad = lambda xs, n: xs + [0] * (n - len(xs))
+  return RECORD.pack(len(numbers), target, *pad(numbers, MAX_NUMBERS), *pad(code, 2*MAX_NUMBERS-1))
+
+def decode(buf, offset:int=0) -> tuple[list[int], int, int|tuple]:
+  count, target, *rest = RECORD.unpack_from(buf, offset)
+  numbers, code = rest[:count], rest[MAX_NUMBERS:MAX_NUMBERS+2*count-1]
+  stack, leaves = [], iter(numbers)
+  for c in code:
+    if c == LEAF: stack.append(next(leaves))
+    else: right = stack.pop(); stack.append((OPS[c-1], stack.pop(), right))
+  return list(numbers), target, stack[0]
+
+def append(path:str, puzzles) -> int:
+  """Appends (numbers, target, tree) puzzles to the bank, returns how many were written."""
+  written = 0
+  with open(path, 'ab') as f:
+    for _, target, tree in puzzles: f.write(encode(target, tree)); written += 1
+  return written
+
+def mapped(f):
+  """Read-only mmap of f, or empty bytes for an empty file, which mmap refuses."""
+  return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else memoryview(b'')
+
+def index(path:str):
+  """Counting sort of record ids by (count, target) into <path>.idx, two passes over the mmap."""
+  size = os.path.getsize(path) // RECORD.size
+  with open(path, 'rb') as f, mapped(f) as data:
+    keys = Counter(KEY.unpack_from(data, i * RECORD.size) for i in range(size))
+    order = sorted(keys)
+    start, pos = HEADER.size + len(order) * ENTRY.size, {}
+    with open(path + '.idx', 'wb') as idx:
+      idx.write(HEADER.pack(size, len(order)))
+      offset = 0
+      for key in order:
+        idx.write(ENTRY.pack(*key, offset, keys[key]))
+        pos[key] = start + offset * ID.size
+        offset += keys[key]
+      idx.truncate(start + size * ID.size)
+    with open(path + '.idx', 'r+b') as idx, mmap.mmap(idx.fileno(), 0) as ids:
+      for i in range(size):
+        key = KEY.unpack_from(data, i * RECORD.size)
+        ID.pack_into(ids, pos[key], i)
+        pos[key] += ID.size
+
+class Bank:
+  def __init__(self, path:str):
+    self.file = open(path, 'rb')
+    self.data = mapped(self.file)
+    self.idx_file = open(path + '.idx', 'rb')
+    self.idx = mmap.mmap(self.idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+    _, n_keys = HEADER.unpack_from(self.idx, 0)
+    self.ids_at = HEADER.size + n_keys * ENTRY.size
+    self.keys, self.counts = {}, {} # (count, target) / count -> (start, length) into the id array
+    for i in range(n_keys):
+      count, target, start, length = ENTRY.unpack_from(self.idx, HEADER.size + i * ENTRY.size)
+      self.keys[count, target] = (start, length)
+      first, total = self.counts.get(count, (start, 0)) # keys are sorted, so each count is contiguous
+      self.counts[count] = (first, total + length)
+
+  def __len__(self): return len(self.data) // RECORD.size
+  def __getitem__(self, i:int): return decode(self.data, i * RECORD.size)
+
+  def targets(self, count:int) -> list[int]: return [t for c, t in self.keys if c == count]
+
+  def sample(self, count:int|None=None, target:int|None=None, rng=random) -> tuple[list[int], int, int|tuple]|None:
+    """A uniformly random puzzle, optionally restricted to a number count and target."""
+    if count is None: return self[rng.randrange(len(self))] if len(self) else None
+    start, length = self.keys.get((count, target), (0, 0)) if target is not None else self.counts.get(count, (0, 0))
+    if not length: return None
+    return self[ID.unpack_from(self.idx, self.ids_at + (start + rng.randrange(length)) * ID.size)[0]]
+
+  def close(self):
+    if isinstance(self.data, mmap.mmap): self.data.close() # not the empty-file stand-in
+    self.file.close(); self.idx.close(); self.idx_file.close()
+
+if __name__ == '__main__':
+  cmd, *args = sys.argv[1:] or ['']
+  if (cmd, len(args)) not in (('build', 2), ('index', 1)): sys.exit('usage: ./puzzle_bank.py build <path> <puzzles>\n       ./puzzle_bank.py index <path>')
+  path, *args = args
+  if cmd == 'build':
+    total, seed, st = int(args[0]), seeds.root_seed(), time.time()
+    append(path, (twentyfour.puzzle_at(seed, i) for i in range(total)))
+    print(f'Generated {total} puzzles of SEED={seed:#x} in {time.time()-st:.2f}s')
+  index(path)
+  print(f'Indexed {os.path.getsize(path) // RECORD.size} puzzles')
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# warm worker processes for risky calls, with wall-time, RLIMIT_AS and RLIMIT_CPU limits
+import importlib, math, multiprocessing, queue, resource, signal, threading
+
+def serve(conn, memory, preload):
+  if memory: resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+  for name in preload: importlib.import_module(name)
+  try: conn.send('ready')
+  except (BrokenPipeError, ConnectionError): return # the sandbox closed while we were starting
+  while True:
+    try: fn, args, cpu = conn.recv()
+    except (EOFError, ConnectionError): return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY)) # SIGXCPU kills us past this
+    try: conn.send((True, fn(*args)))
+    except BaseException as e: conn.send((False, e))
+
+class Sandbox:
+  def __init__(self, workers=2, timeout=0.5, memory_mb=1024, preload=()):
+    methods = multiprocessing.get_all_start_methods()
+    self.ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    self.timeout, self.memory, self.preload = timeout, memory_mb * 2**20, tuple(preload)
+    self.idle, self.closed, self.respawning = queue.Queue(), False, []
+    for _ in range(workers): self.idle.put(self.spawn())
+
+  def spawn(self):
+    conn, child = self.ctx.Pipe()
+    proc = self.ctx.Process(target=serve, args=(child, self.memory, self.preload), daemon=True)
+    proc.start()
+    child.close()
+    conn.recv() # preloading happens before the worker is handed out, not inside a call's time limit
+    return proc, conn
+
+  def release(self, proc, conn):
+    if self.closed: conn.close(); proc.kill(); proc.join()
+    else: self.idle.put((proc, conn))
+
+  def replace(self, proc, conn):
+    proc.kill(); conn.close()
+    def respawn():
+      proc.join()
+      if self.closed: return
+      try: self.release(*self.spawn()) # close() may have run meanwhile, then release kills it
+      except (EOFError, OSError): pass # the forkserver is gone, we are shutting down
+    thread = threading.Thread(target=respawn, daemon=True)
+    self.respawning = [t for t in self.respawning if t.is_alive()] + [thread]
+    thread.start()
+
+  def call(self, fn, *args, timeout=None):
+    """fn(*args) in a worker; raises TimeoutError/MemoryError past the limits, or whatever fn raised."""
+    timeout = self.timeout if timeout is None else timeout
+    if (worker := self.idle.get()) is None: self.idle.put(None); raise RuntimeError('sandbox closed') # pass the wake-up on
+    proc, conn = worker
+    try:
+      conn.send((fn, args, timeout))
+      if not conn.poll(timeout): raise TimeoutError('TLE')
+      ok, value = conn.recv()
+    except TimeoutError: # before OSError, which it subclasses
+      self.replace(proc, conn)
+      raise
+    except (EOFError, OSError): # the worker died: out of memory or over its CPU limit
+      proc.join()
+      self.replace(proc, conn)
+      raise TimeoutError('TLE') if proc.exitcode == -signal.SIGXCPU else MemoryError('worker died')
+    except BaseException: # e.g. fn or args don't pickle, or Ctrl+C mid-call: the pipe's state is unknown
+      self.replace(proc, conn)
+      raise
+    if not ok and isinstance(value, MemoryError): self.replace(proc, conn) # don't reuse a heap that hit the limit
+    else: self.release(proc, conn)
+    if not ok: raise value
+    return value
+
+  def close(self):
+    """Kills the idle workers, waits for respawns to finish, and makes busy workers exit when their call returns.
+    Later calls raise RuntimeError."""
+    self.closed = True
+    for thread in self.respawning: thread.join()
+    while True:
+      try: worker = self.idle.get_nowait()
+      except queue.Empty: break
+      if worker: proc, conn = worker; conn.close(); proc.kill(); proc.join()
+    self.idle.put(None) # wakes calls waiting for a worker that will never come back
+
+  def __enter__(self): return self
+  def __exit__(self, *a): self.close()
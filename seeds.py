@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# reproducible random streams derived from a root seed, and puzzles addressed by (seed, index)
+# SEED=<int or 0x hex> fixes the root seed of a run
+import hashlib, os, random, secrets
+
+SPAWN = -1 # key prefix of worker seeds, puzzle indices are >= 0
+
+def derive(seed:int, *key:int) -> int:
+  """A 128-bit seed for the stream at key under seed."""
+  h = hashlib.blake2b(digest_size=16)
+  for part in (seed, *key): h.update(part.to_bytes(17, 'little', signed=True))
+  return int.from_bytes(h.digest(), 'little')
+
+def stream(seed:int, *key:int) -> random.Random: return random.Random(derive(seed, *key))
+def spawn(seed:int, n:int) -> list[int]: return [derive(seed, SPAWN, i) for i in range(n)]
+
+def root_seed() -> int:
+  """SEED from the environment, or a fresh random one."""
+  return int(os.environ['SEED'], 0) if os.getenv('SEED') else secrets.randbits(64)
+
+def from_env() -> random.Random: return stream(root_seed())
+
+def at(generate, seed:int, index:int):
+  """Puzzle index of seed: generate(rng) on stream (seed, index), retried in that stream until it isn't None."""
+  rng = stream(seed, index)
+  while (puzzle := generate(rng)) is None: pass
+  return puzzle
+
+def format_id(seed:int, index:int) -> str: return f'{seed:x}-{index}'
+
+def parse_id(text:str) -> tuple[int, int]:
+  seed, index = text.strip().rsplit('-', 1)
+  return int(seed, 16), int(index)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# plain-text TCP server for twentyfour and zetamac (nc/telnet work)
+# usage: ./server.py serve [--port 7624] [--workers N] [--seed HEX]
+#        ./server.py load [--clients 1000] [--game zetamac|twentyfour] [--rounds 10]
+import argparse, ast, asyncio, itertools, re, resource, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import seeds, twentyfour, zetamac
+
+HOST = '127.0.0.1'
+PORT = 7624
+PUZZLE_BATCH = 16 # puzzles per worker job
+PUZZLE_QUEUE = 512
+ZETAMAC_DURATION = 120
+IDLE_TIMEOUT = 600 # seconds without a line before a session is dropped
+LINE_LIMIT = 1024
+RETRY_DELAY = 1 # seconds before a failed puzzle batch is tried again
+NOFILE_MAX = 65536 # soft descriptor limit to raise to, where the hard limit allows
+ZETAMAC_KEY = -2 # stream key prefix of zetamac games, apart from puzzle indices and seeds.SPAWN
+
+def generate_batch(seed, start, n):
+  """(index, puzzle) for puzzles start..start+n of seed, the same whichever worker makes them."""
+  return [(i, twentyfour.puzzle_at(seed, i)) for i in range(start, start + n)]
+
+async def send(writer, text):
+  writer.write(text.encode())
+  await writer.drain() # backpressure: waits while this client's buffer is full
+
+async def readline(reader, timeout=IDLE_TIMEOUT):
+  line = await asyncio.wait_for(reader.readline(), timeout)
+  if not line: raise EOFError
+  return line.decode(errors='replace').strip()
+
+class Server:
+  def __init__(self, workers, sandbox, seed):
+    self.pool, self.workers = ProcessPoolExecutor(workers), workers
+    self.seed, self.index = seed, 0 # the next batch starts at puzzle index of seed
+    self.threads = ThreadPoolExecutor(sandbox.idle.qsize() * 2)
+    self.sandbox = sandbox
+    self.puzzles = asyncio.Queue(PUZZLE_QUEUE)
+    self.sessions, self.zetamac_games = 0, itertools.count() # game i draws from seeds.stream(seed, ZETAMAC_KEY, i)
+
+  def check(self, tree, target): return self.sandbox.call(twentyfour.check_answer, tree, target) # judge parsed it already
+
+  async def produce(self):
+    loop = asyncio.get_running_loop()
+    while True:
+      start, self.index = self.index, self.index + PUZZLE_BATCH
+      while True: # a dead producer would leave twentyfour sessions waiting on the queue forever, so retry
+        pool = self.pool
+        try: batch = await loop.run_in_executor(pool, generate_batch, self.seed, start, PUZZLE_BATCH); break
+        except Exception as e:
+          print(f'Puzzle batch {start} failed: {e!r}, retrying', file=sys.stderr)
+          if isinstance(e, BrokenProcessPool) and pool is self.pool: self.pool = ProcessPoolExecutor(self.workers)
+          await asyncio.sleep(RETRY_DELAY)
+      for puzzle in batch: await self.puzzles.put(puzzle) # blocks once the queue is full
+
+  async def handle(self, reader, writer):
+    self.sessions += 1
+    try:
+      await send(writer, 'Game (zetamac/twentyfour): ')
+      game = await readline(reader)
+      if game == 'zetamac': await self.zetamac(reader, writer)
+      elif game == 'twentyfour': await self.twentyfour(reader, writer)
+      else: await send(writer, f'Unknown game {game!r}\n')
+    except (EOFError, TimeoutError, ConnectionError, ValueError): pass # ValueError: line over LINE_LIMIT
+    finally:
+      self.sessions -= 1
+      writer.close()
+      try: await writer.wait_closed()
+      except ConnectionError: pass
+
+  async def zetamac(self, reader, writer):
+    loop, score, rng = asyncio.get_running_loop(), 0, seeds.stream(self.seed, ZETAMAC_KEY, next(self.zetamac_games))
+    deadline = loop.time() + ZETAMAC_DURATION
+    while True:
+      op, prompt, exact = zetamac.new_question(rng)
+      while True:
+        await send(writer, prompt)
+        try: line = await readline(reader, deadline - loop.time())
+        except TimeoutError: await send(writer, f'\nAnswer: {exact}\nScore: {score}\n'); return
+        if zetamac.check(line, exact): break
+      score += 1
+      await send(writer, f'Score: {score}\n')
+
+  async def twentyfour(self, reader, writer):
+    loop, score = asyncio.get_running_loop(), 0
+    while True:
+      index, (numbers, target, tree) = await self.puzzles.get()
+      numbers, revealed = sorted(numbers), False
+      await send(writer, f'Puzzle {seeds.format_id(self.seed, index)}\n{numbers}\nTarget: {target}\n')
+      while True:
+        await send(writer, 'Expression: ')
+        line = await readline(reader)
+        if line == 'n': break
+        if line == 'q':
+          revealed = True
+          await send(writer, f'Solution: {ast.unparse(ast.parse(twentyfour.render(tree)))}\n')
+          continue
+        try: correct, message = await loop.run_in_executor(self.threads, twentyfour.judge, line, numbers, target, self.check)
+        except Exception as e: correct, message = False, f'Error: {e}'
+        await send(writer, message + '\n')
+        if correct:
+          score += not revealed
+          await send(writer, f'Score: {score}\n')
+          break
+
+  async def serve(self, host, port):
+    producers = [asyncio.create_task(self.produce()) for _ in range(self.workers)]
+    server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT, backlog=4096)
+    print(f'Serving on {host}:{port}, puzzle seed {self.seed:x}')
+    async with server: await server.serve_forever()
+
+async def stand_in(host, port, game, rounds, latencies):
+  """A scripted client playing rounds of game, appending the seconds each answer took to come back."""
+  reader, writer = await asyncio.open_connection(host, port, limit=2**16)
+  await reader.readuntil(b': ')
+  writer.write(f'{game}\n'.encode())
+  for _ in range(rounds):
+    if game == 'zetamac':
+      prompt = (await reader.readuntil(b'= ')).decode().splitlines()[-1]
+      st = time.perf_counter()
+      writer.write(f'{eval(prompt[:-2])}\n'.encode())
+      await reader.readuntil(b'Score: ')
+    else:
+      await reader.readuntil(b'Expression: ')
+      writer.write(b'q\n')
+      solution = (await reader.readuntil(b'Expression: ')).decode()
+      solution = re.search(r'Solution: (.*)', solution).group(1)
+      st = time.perf_counter()
+      writer.write(f'{solution}\n'.encode())
+      await reader.readuntil(b'Score: ')
+    latencies.append(time.perf_counter() - st)
+  writer.close()
+
+async def load(args):
+  latencies, st = [], time.perf_counter()
+  results = await asyncio.gather(*(stand_in(args.host, args.port, args.game, args.rounds, latencies) for _ in range(args.clients)), return_exceptions=True)
+  elapsed, failed = time.perf_counter() - st, sum(isinstance(r, Exception) for r in results)
+  latencies.sort()
+  pct = lambda p: latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1e3 if latencies else float('nan')
+  print(f'{args.clients} clients, {failed} failed, {len(latencies)} answers in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)')
+  print(f'answer latency p50 {pct(50):.1f}ms, p95 {pct(95):.1f}ms, p99 {pct(99):.1f}ms')
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('mode', choices=['serve', 'load'])
+  parser.add_argument('--host', default=HOST)
+  parser.add_argument('--port', type=int, default=PORT)
+  parser.add_argument('--workers', type=int, default=2, help='generator processes')
+  parser.add_argument('--sandbox', type=int, default=twentyfour.SANDBOX_WORKERS, help='answer checking processes')
+  parser.add_argument('--clients', type=int, default=1000)
+  parser.add_argument('--game', default='zetamac', choices=['zetamac', 'twentyfour'])
+  parser.add_argument('--rounds', type=int, default=10)
+  parser.add_argument('--seed', type=lambda x: int(x, 16), default=None, help='puzzle seed (hex), as in the puzzle IDs; fresh by default')
+  args = parser.parse_args()
+
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE) # one descriptor per session
+  want = NOFILE_MAX if hard == resource.RLIM_INFINITY else min(hard, NOFILE_MAX) # an infinite soft limit is rejected
+  if soft != resource.RLIM_INFINITY and soft < want:
+    try: resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+    except (ValueError, OSError): pass # e.g. macOS caps it below hard, keep the default
+  if args.mode == 'load': asyncio.run(load(args)); sys.exit()
+
+  from sandbox import Sandbox
+  sandbox = Sandbox(args.sandbox, twentyfour.SANDBOX_TIMEOUT, twentyfour.SANDBOX_MEMORY_MB)
+  try: asyncio.run(Server(args.workers, sandbox, seeds.root_seed() if args.seed is None else args.seed).serve(args.host, args.port))
+  except KeyboardInterrupt: pass
+  finally: sandbox.close()
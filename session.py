@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# timed drill sessions that end exactly at the deadline, even mid-answer
+import os, select, sys, termios, time
+
+class Session:
+  def __init__(self, duration, stdin=None, stdout=None):
+    self.stdin, self.stdout = stdin or sys.stdin, stdout or sys.stdout
+    self.fd = self.stdin.fileno()
+    self.deadline = time.monotonic() + duration
+    self.buffer = b''
+
+  def remaining(self): return max(0.0, self.deadline - time.monotonic())
+
+  def input(self, prompt='', timeout=None):
+    """Like input(), but raises TimeoutError once the session is over, and returns None after timeout seconds."""
+    self.stdout.write(prompt)
+    self.stdout.flush()
+    until = min(self.deadline, time.monotonic() + timeout) if timeout is not None else self.deadline
+    while b'\n' not in self.buffer:
+      left = until - time.monotonic()
+      if left <= 0:
+        if until < self.deadline: self.close(); return None
+        raise TimeoutError('session over')
+      if not select.select([self.fd], [], [], left)[0]: continue
+      chunk = os.read(self.fd, 4096)
+      if not chunk:
+        if self.buffer: break # last line without a newline
+        raise EOFError
+      self.buffer += chunk
+    line, _, self.buffer = self.buffer.partition(b'\n')
+    return line.decode(errors='replace').rstrip('\r')
+
+  def close(self):
+    if os.isatty(self.fd): termios.tcflush(self.fd, termios.TCIFLUSH)
+
+  def __enter__(self): return self
+  def __exit__(self, *a): self.close()
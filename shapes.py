@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# full binary tree shapes as postfix words, ranked and sampled with Catalan tables
+import bisect, functools, random, sys
+
+CATALAN = [1]
+
+def catalan(k:int) -> int:
+  while len(CATALAN) <= k: n = len(CATALAN) - 1; CATALAN.append(CATALAN[n] * 2 * (2*n + 1) // (n + 2))
+  return CATALAN[k]
+
+def count(n:int) -> int: return catalan(n - 1)
+
+@functools.cache
+def splits(n:int) -> tuple[range, list[int]]:
+  """(left subtree sizes, cumulative shape counts) for the root split of an n-leaf shape."""
+  cum, total = [], 0
+  for k in range(1, n):
+    total += catalan(k - 1) * catalan(n - k - 1)
+    cum.append(total)
+  return range(1, n), cum
+
+def sample(n:int, rng=random) -> list[bool]:
+  word = [True] * n + [False] * (n - 1)
+  rng.shuffle(word)
+  depth = low = start = 0
+  for i in range(len(word) - 1): # the valid rotation starts right after the last lowest prefix
+    depth += 1 if word[i] else -1
+    if depth <= low: low, start = depth, i + 1
+  return word[start:] + word[:start]
+
+def rank(word:list[bool]) -> int:
+  stack = [] # (leaves, rank) of finished subtrees
+  for leaf in word:
+    if leaf: stack.append((1, 0)); continue
+    nr, rr = stack.pop(); nl, rl = stack.pop()
+    n = nl + nr
+    stack.append((n, (splits(n)[1][nl - 2] if nl > 1 else 0) + rl * catalan(nr - 1) + rr))
+  return stack[0][1]
+
+def unrank(n:int, r:int) -> list[bool]:
+  if not 0 <= r < count(n): raise ValueError(f'no shape {r} with {n} leaves')
+  word, todo = [], [(n, r)] # (leaves, rank) still to expand, None for a pending operator node
+  while todo:
+    task = todo.pop()
+    if task is None: word.append(False); continue
+    n, r = task
+    if n == 1: word.append(True); continue
+    sizes, cum = splits(n)
+    i = bisect.bisect_right(cum, r)
+    nl = sizes[i]
+    rl, rr = divmod(r - (cum[i - 1] if i else 0), catalan(n - nl - 1))
+    todo += [None, (n - nl, rr), (nl, rl)]
+  return word
+
+def all_shapes(n:int):
+  for r in range(count(n)): yield unrank(n, r)
+
+def to_tree(word:list[bool], leaves, ops) -> int|tuple:
+  """Fills a shape with leaves and ops (both in postfix order) as an (op, left, right) tuple tree."""
+  leaves, ops, stack = iter(leaves), iter(ops), []
+  for leaf in word:
+    if leaf: stack.append(next(leaves))
+    else: right = stack.pop(); stack.append((next(ops), stack.pop(), right))
+  return stack[0]
+
+if __name__ == '__main__':
+  # usage: ./shapes.py [leaves], lists every shape with its rank
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+  for r, word in enumerate(all_shapes(n)):
+    print(r, to_tree(word, ['x'] * n, ['.'] * (n - 1)))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# exhaustive subset-DP solver: counts ordered expression trees using every number once
+# small subsets get value -> count tables, larger ones are met in the middle from a target
+import math, sys
+from collections import Counter
+from fractions import Fraction
+from twentyfour import MAX_VALUE, combine, iroot, render
+
+def popcount(mask:int) -> int: return mask.bit_count()
+
+def submasks(mask:int):
+  sub = (mask - 1) & mask
+  while sub:
+    yield sub
+    sub = (sub - 1) & mask
+
+LIMIT = int(MAX_VALUE)
+Value = int | tuple[int, int] # whole values are ints, the rest (numerator, denominator > 1) in lowest terms: tuples hash far faster than Fractions
+
+def rational(n:int, d:int) -> Value:
+  """n/d as a Value, d != 0."""
+  g = math.gcd(n, d)
+  if d < 0: g = -g
+  return n // g if d == g else (n // g, d // g)
+
+def parts(v:Value) -> tuple[int, int]: return (v, 1) if type(v) is int else v
+def to_fraction(v:Value) -> Fraction: return Fraction(*parts(v))
+def to_value(x:int|Fraction) -> Value: return rational(x.numerator, x.denominator)
+def neg(v:Value) -> Value: return -v if type(v) is int else (-v[0], v[1])
+def exceeds(v:Value, k:int) -> bool: return v > k if type(v) is int else v[0] > k * v[1]
+
+def add(x:Value, y:Value) -> Value:
+  if type(x) is int and type(y) is int: return x + y
+  (xn, xd), (yn, yd) = parts(x), parts(y)
+  return rational(xn * yd + yn * xd, xd * yd)
+
+def mul(x:Value, y:Value) -> Value:
+  if type(x) is int and type(y) is int: return x * y
+  (xn, xd), (yn, yd) = parts(x), parts(y)
+  return rational(xn * yn, xd * yd)
+
+def div(x:Value, y:Value) -> Value:
+  if type(x) is int and type(y) is int: return x // y if x % y == 0 else rational(x, y)
+  (xn, xd), (yn, yd) = parts(x), parts(y)
+  return rational(xn * yd, xd * yn)
+
+def raise_to(a:Value, b:Value) -> Value|None:
+  """twentyfour.combine('**', a, b) before the MAX_VALUE check."""
+  if exceeds(a, 20) or exceeds(b, 10) or exceeds(neg(b), 10): return None
+  (an, ad), (bn, bd) = parts(a), parts(b)
+  if bd > 1: # a root, rational only for a >= 0 whose parts are perfect powers
+    if an <= 0: return 0 if an == 0 and bn > 0 else None
+    an, ad = iroot(an, bd), iroot(ad, bd)
+    if an is None or ad is None: return None
+  if bn >= 0: return rational(an ** bn, ad ** bn)
+  return rational(ad ** -bn, an ** -bn) if an else None
+
+def pair_values(a:Value, b:Value) -> list[Value]:
+  """Values of (a op b) and (b op a) for every op, one entry per tree (so a + b is there twice), limits applied."""
+  if type(a) is int and type(b) is int: # most of the work, so without the helpers
+    s, p, d = a + b, a * b, a - b
+    out = [s, s, p, p, d, -d]
+    if b: out.append(a // b if a % b == 0 else rational(a, b))
+    if a: out.append(b // a if b % a == 0 else rational(b, a))
+    if a <= 20 and -10 <= b <= 10 and (a or b >= 0): out.append(a ** b if b >= 0 else rational(1, a ** -b))
+    if b <= 20 and -10 <= a <= 10 and (b or a >= 0): out.append(b ** a if a >= 0 else rational(1, b ** -a))
+    return [v for v in out if (v <= LIMIT if type(v) is int else v[0] <= LIMIT * v[1])]
+  (an, ad), (bn, bd) = parts(a), parts(b)
+  x, y, den = an * bd, bn * ad, ad * bd
+  s, p, d = rational(x + y, den), rational(an * bn, den), rational(x - y, den)
+  out = [s, s, p, p, d, neg(d)]
+  if y: out.append(rational(x, y))
+  if x: out.append(rational(y, x))
+  for l, r in (a, b), (b, a):
+    if (v := raise_to(l, r)) is not None: out.append(v)
+  return [v for v in out if (v <= LIMIT if type(v) is int else v[0] <= LIMIT * v[1])]
+
+def combine_values(op:str, a:Value, b:Value) -> Value|None:
+  """twentyfour.combine on Values, for the rare candidates an inverse can't vouch for."""
+  v = combine(op, to_fraction(a), to_fraction(b))
+  return None if v is None else to_value(v)
+
+def log(v:Value) -> float:
+  n, d = parts(v)
+  return math.log(abs(n)) - math.log(d) # no float underflow/overflow
+
+def exponents(a:Value, t:Value) -> list[Value]|None:
+  """Candidates c with a**c == t, or None if any c might work."""
+  if a == 0: return None if t == 0 else [0] if t == 1 else [] # 0**c is 0 for c > 0
+  if a == 1: return None if t == 1 else []
+  if a == -1: return None if t in (1, -1) else []
+  if t == 0 or parts(a)[0] > 0 and parts(t)[0] < 0: return []
+  if type(a) is int and type(t) is int and t != 1 and math.gcd(a, t) == 1: return [] # |a| > 1 gives a whole t != 1 only for c > 0, sharing a's primes
+  # a**c == t means c = log|t| / log|a|, and a rational root of a needs as many bits as its degree
+  exp = log(t) / log(a)
+  if abs(exp) > 10: return []
+  n, d = parts(a)
+  for q in range(1, max(n.bit_length(), d.bit_length()) + 1):
+    if abs(round(exp * q) - exp * q) < 1e-9: return [rational(round(exp * q), q)]
+  return []
+
+def bases(a:Value, t:Value) -> list[Value]|None:
+  """Candidates c with c**a == t, or None if any c might work."""
+  if a == 0: return None if t == 1 else []
+  (p, q), (tn, td) = parts(a), parts(t)
+  if tn == 0: return [0] if p > 0 else []
+  if p < 0: p, tn, td = -p, td, tn # c**-x == t means c**x == 1/t
+  if td < 0: tn, td = -tn, -td
+  # c = t**(q/p), a root of t that must be rational, then a power that the ** guard caps at 20 when q > 1 (c >= 0)
+  rn, rd = iroot(abs(tn), p), iroot(td, p)
+  if rn is None or rd is None: return []
+  if q == 1: return [rational(rn, rd), rational(-rn, rd)]
+  if tn < 0 or rn > rd and q * (math.log(rn) - math.log(rd)) > math.log(20) + 1e-9: return []
+  return [rational(rn ** q, rd ** q)]
+
+def some(cands:list|None) -> list: return [None] if cands is None else cands
+
+def inverses(a:Value, t:Value) -> list[tuple[str, bool, Value|None]]:
+  """(op, a on the left, c) for each tree (a op c) or (c op a) that could equal t; c is None where any c might."""
+  if type(a) is int and type(t) is int: # half the calls, so without the helpers
+    out = [('+', True, t - a), ('+', False, t - a), ('-', True, a - t), ('-', False, t + a)]
+    if a:
+      c = t // a if t % a == 0 else rational(t, a)
+      out += [('*', True, c), ('*', False, c), ('/', False, t * a)]
+      if t: out.append(('/', True, a // t if a % t == 0 else rational(a, t)))
+  else:
+    d = add(t, neg(a))
+    out = [('+', True, d), ('+', False, d), ('-', True, neg(d)), ('-', False, add(t, a))]
+    if a:
+      c = div(t, a)
+      out += [('*', True, c), ('*', False, c), ('/', False, mul(t, a))]
+      if t: out.append(('/', True, div(a, t)))
+  if a == 0 and t == 0: out += [('*', True, None), ('*', False, None), ('/', True, None)]
+  if not exceeds(a, 20): out += [('**', True, c) for c in some(exponents(a, t))]
+  if not exceeds(a, 10) and not exceeds(neg(a), 10): out += [('**', False, c) for c in some(bases(a, t))]
+  return out
+
+class Solver:
+  def __init__(self, numbers:list[int]):
+    self.numbers = list(numbers)
+    self.full = (1 << len(numbers)) - 1
+    self.enumerate_upto = max(len(numbers) - 2, 3) # larger subsets are solved target-first
+    self.table = {1 << i: {x: 1} for i, x in enumerate(numbers)}
+    self.memo = {}
+    self.duplicates = math.prod(math.factorial(m) for m in Counter(numbers).values())
+
+  def values(self, mask:int) -> dict[Value, int]:
+    """Every value reachable from the subset, mapped to its number of trees."""
+    if mask in self.table: return self.table[mask]
+    vals = {}
+    get = vals.get
+    for sub in submasks(mask):
+      if sub < mask ^ sub: continue # pair_values covers both orders of a split
+      right = self.values(mask ^ sub)
+      for a, ca in self.values(sub).items():
+        for b, cb in right.items():
+          n = ca * cb
+          for v in pair_values(a, b): vals[v] = get(v, 0) + n
+    self.table[mask] = vals
+    return vals
+
+  def splits(self, mask:int):
+    """(small, big, count of trees over big for a value) for every split of the subset, from its smaller side."""
+    for small in submasks(mask):
+      big = mask ^ small
+      if popcount(small) > popcount(big) or popcount(small) == popcount(big) and small > big: continue
+      yield small, big, self.values(big).get if popcount(big) <= self.enumerate_upto else lambda c, _, big=big: self.trees(big, c)
+
+  def checked(self, big:int, op:str, left:bool, a:Value, c:Value|None, t:Value) -> list[Value]:
+    """The candidates from an inverse that can't vouch for them (** or c None, any value of big) that really give t."""
+    return [c for c in ((c,) if c is not None else self.values(big)) if combine_values(op, *((a, c) if left else (c, a))) == t]
+
+  def matches(self, mask:int, t:Value):
+    """Yields (op, left mask, a, b, number of such trees) for every split of the subset with (a op b) == t.
+    Each split is walked from its smaller side, whose values give the other side's target by inverting op."""
+    if exceeds(t, LIMIT): return
+    for small, big, trees in self.splits(mask):
+      for a, ca in self.values(small).items():
+        for op, left, c in inverses(a, t):
+          for c in (c,) if c is not None and op != '**' else self.checked(big, op, left, a, c, t):
+            if n := trees(c, 0): yield (op, small, a, c, ca * n) if left else (op, big, c, a, ca * n)
+
+  def trees(self, mask:int, t:Value|Fraction) -> int:
+    """Number of ordered trees over the subset (leaves labelled by position) that evaluate to t."""
+    if isinstance(t, Fraction): t = to_value(t)
+    if popcount(mask) <= self.enumerate_upto: return self.values(mask).get(t, 0)
+    if (mask, t) in self.memo: return self.memo[mask, t]
+    total = 0 # what summing matches() gives, without building each match
+    if not exceeds(t, LIMIT):
+      for small, big, trees in self.splits(mask):
+        for a, ca in self.values(small).items():
+          for op, left, c in inverses(a, t):
+            if c is not None and op != '**': total += ca * trees(c, 0) # an exact inverse, the common case
+            else: total += ca * sum(trees(c, 0) for c in self.checked(big, op, left, a, c, t))
+    self.memo[mask, t] = total
+    return total
+
+  def exists(self, mask:int, t:Value) -> bool:
+    """trees(mask, t) > 0, stopping at the first match."""
+    if popcount(mask) <= self.enumerate_upto or (mask, t) in self.memo: return self.trees(mask, t) > 0
+    return next(self.matches(mask, t), None) is not None
+
+  def tree(self, mask:int, t:Value|Fraction) -> int|tuple:
+    """Rebuilds one (op, left, right) tree over the subset that evaluates to t."""
+    if isinstance(t, Fraction): t = to_value(t)
+    if popcount(mask) == 1: return self.numbers[mask.bit_length() - 1]
+    op, left, a, b, _ = next(self.matches(mask, t))
+    return op, self.tree(left, a), self.tree(mask ^ left, b)
+
+  def reachable(self) -> set[Fraction]: return {to_fraction(v) for v in self.values(self.full)}
+  def solvable(self, target:int) -> bool: return self.exists(self.full, target)
+  def count(self, target:int) -> int: return self.trees(self.full, target) // self.duplicates
+
+  def solution(self, target:int) -> str|None:
+    return render(self.tree(self.full, target)) if self.solvable(target) else None
+
+  def shortest(self, target:int) -> str|None:
+    """A solution using as few of the numbers as possible (a puzzle is trivial if that is few)."""
+    for mask in sorted(range(1, self.full + 1), key=popcount):
+      if self.exists(mask, target): return render(self.tree(mask, target))
+    return None
+
+if __name__ == '__main__':
+  *numbers, target = map(int, sys.argv[1:])
+  solver = Solver(numbers)
+  print(f'Solutions: {solver.count(target)}')
+  print(f'Shortest:  {solver.shortest(target)}')
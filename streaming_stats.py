@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# constant-memory, mergeable histograms and moments for long sampling runs
+import json, math, os
+from array import array
+from collections import Counter
+
+class Histogram:
+  __slots__ = ('lo', 'hi', 'counts', 'under', 'over')
+
+  def __init__(self, lo, hi, bins):
+    self.lo, self.hi = lo, hi
+    self.counts = array('Q', bytes(8 * bins))
+    self.under = self.over = 0
+
+  def add(self, x, n=1):
+    if x < self.lo: self.under += n
+    elif x >= self.hi: self.over += n
+    else: self.counts[int((x - self.lo) * len(self.counts) // (self.hi - self.lo))] += n
+
+  def merge(self, other):
+    for i, c in enumerate(other.counts): self.counts[i] += c
+    self.under += other.under; self.over += other.over
+
+  def edges(self):
+    bins = len(self.counts)
+    return [self.lo + (self.hi - self.lo) * i / bins for i in range(bins + 1)]
+
+  def total(self): return sum(self.counts) + self.under + self.over
+  def to_dict(self): return {'lo': self.lo, 'hi': self.hi, 'counts': list(self.counts), 'under': self.under, 'over': self.over}
+
+  @classmethod
+  def from_dict(cls, d):
+    h = cls(d['lo'], d['hi'], len(d['counts']))
+    h.counts, h.under, h.over = array('Q', d['counts']), d['under'], d['over']
+    return h
+
+class Moments:
+  """Running count/mean/variance/min/max (Welford, merged with Chan et al.)."""
+  __slots__ = ('n', 'mean', 'm2', 'min', 'max')
+
+  def __init__(self): self.n, self.mean, self.m2, self.min, self.max = 0, 0.0, 0.0, math.inf, -math.inf
+
+  def add(self, x):
+    self.n += 1
+    delta = x - self.mean
+    self.mean += delta / self.n
+    self.m2 += delta * (x - self.mean)
+    if x < self.min: self.min = x
+    if x > self.max: self.max = x
+
+  def merge(self, other):
+    if not other.n: return
+    n = self.n + other.n
+    delta = other.mean - self.mean
+    self.mean += delta * other.n / n
+    self.m2 += other.m2 + delta * delta * self.n * other.n / n
+    self.n, self.min, self.max = n, min(self.min, other.min), max(self.max, other.max)
+
+  @property
+  def std(self): return math.sqrt(self.m2 / self.n) if self.n else 0.0
+  def to_dict(self): return {'n': self.n, 'mean': self.mean, 'std': self.std, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+  @classmethod
+  def from_dict(cls, d):
+    m = cls()
+    m.n, m.mean, m.m2, m.min, m.max = d['n'], d['mean'], d.get('m2', d['std'] ** 2 * d['n']), d['min'], d['max']
+    return m
+
+class SampleStats:
+  """Operator counts, leaf and target histograms and target moments for a stream of puzzles."""
+
+  def __init__(self, number_range, target_range, leaf_bins=None, target_bins=50):
+    self.ops = Counter()
+    self.leaves = Histogram(number_range[0], number_range[1] + 1, leaf_bins or number_range[1] - number_range[0] + 1)
+    self.targets = Histogram(target_range[0], target_range[1] + 1, target_bins)
+    self.target_moments = Moments()
+    self.samples = self.attempts = 0
+
+  def add_target(self, target):
+    self.targets.add(target)
+    self.target_moments.add(target)
+    self.samples += 1
+
+  def merge(self, other):
+    self.ops.update(other.ops)
+    self.leaves.merge(other.leaves)
+    self.targets.merge(other.targets)
+    self.target_moments.merge(other.target_moments)
+    self.samples += other.samples
+    self.attempts += other.attempts
+
+  def to_dict(self):
+    return {'samples': self.samples, 'attempts': self.attempts, 'ops': dict(self.ops),
+            'leaves': self.leaves.to_dict(), 'targets': self.targets.to_dict(), 'target_moments': self.target_moments.to_dict()}
+
+  @classmethod
+  def from_dict(cls, d):
+    stats = cls.__new__(cls)
+    stats.ops = Counter(d['ops'])
+    stats.leaves, stats.targets = Histogram.from_dict(d['leaves']), Histogram.from_dict(d['targets'])
+    stats.target_moments = Moments.from_dict(d['target_moments'])
+    stats.samples, stats.attempts = d['samples'], d['attempts']
+    return stats
+
+  def snapshot(self, path):
+    """Writes the current tallies as JSON, atomically so a reader never sees half a file."""
+    with open(path + '.tmp', 'w') as f: json.dump(self.to_dict(), f)
+    os.replace(path + '.tmp', path)
+
+class LivePlot:
+  """Redraws draw(axes, stats) into one figure in place, without blocking the sampler."""
+
+  def __init__(self, draw, panels=3, figsize=(15, 5)):
+    import matplotlib.pyplot as plt
+    self.plt, self.draw = plt, draw
+    plt.ion()
+    self.fig, self.axes = plt.subplots(1, panels, figsize=figsize)
+
+  def update(self, stats):
+    for ax in self.axes: ax.clear()
+    self.draw(self.axes, stats)
+    self.fig.tight_layout()
+    self.fig.canvas.draw_idle()
+    self.plt.pause(0.001)
+
+  def show(self):
+    self.plt.ioff()
+    self.plt.show()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# target-first generation for test.py's settings: draw the target, then push it down
+# the tree, only choosing child values their subtrees can reach with + and -
+# usage: ./target_first.py [puzzles]
+import functools, math, random, sys, time
+from flat_tree import FlatTree
+from test import OPS, TARGET_RANGE, NUMBER_RANGE, NUMBER_COUNT, catalan_split, generate_puzzle
+
+VALUE_LIMIT = 2000
+POW_EXP = range(0, 6)
+POW_BASE = range(-19, 20)
+
+def merge(ivs):
+    out = []
+    for lo, hi in sorted(ivs):
+        if out and lo <= out[-1][1] + 1: out[-1][1] = max(out[-1][1], hi)
+        else: out.append([lo, hi])
+    return [(lo, hi) for lo, hi in out]
+
+def clip(ivs, lo, hi): return [(max(a, lo), min(b, hi)) for a, b in ivs if a <= hi and b >= lo]
+def contains(ivs, x): return any(a <= x <= b for a, b in ivs)
+def intersect(a, b): return merge(iv for lo, hi in b for iv in clip(a, lo, hi))
+
+def pick(ivs, rng=random):
+    """Uniform integer from a list of intervals."""
+    k = rng.randrange(sum(hi - lo + 1 for lo, hi in ivs))
+    for lo, hi in ivs:
+        if k <= hi - lo: return lo + k
+        k -= hi - lo + 1
+
+def reachable(tree):
+    """Per node, the integers its subtree reaches using only + and -."""
+    sets = []
+    for i in range(len(tree)):
+        if tree.is_leaf(i): sets.append([tuple(NUMBER_RANGE)]); continue
+        a, b = sets[tree.left[i]], sets[tree.right[i]]
+        sums = [(la + lb, ha + hb) for la, ha in a for lb, hb in b]
+        diffs = [(la - hb, ha - lb) for la, ha in a for lb, hb in b]
+        sets.append(clip(merge(sums + diffs), -VALUE_LIMIT, VALUE_LIMIT))
+    return sets
+
+@functools.cache
+def divisors(t): return [d for k in range(1, math.isqrt(t) + 1) if t % k == 0 for d in {k, t // k}]
+
+@functools.cache
+def powers(t): return [(l, r) for l in POW_BASE for r in POW_EXP if l ** r == t]
+
+def choices(op, t, A, B, rng=random):
+    """A sampler for (l, r) with l in A, r in B and (l op r) == t, or None if there is none."""
+    if op == '+':
+        ls = intersect(A, [(t - hi, t - lo) for lo, hi in B])
+        return ls and (lambda: (l := pick(ls, rng), t - l))
+    if op == '-':
+        ls = intersect(A, [(t + lo, t + hi) for lo, hi in B])
+        return ls and (lambda: (l := pick(ls, rng), l - t))
+    if t == 0: return None # 0 = 0 * r = 0 / r would free a whole subtree, leave it to + and -
+    if op == '*':
+        pairs = [(l * s, t // (l * s)) for l in divisors(abs(t)) for s in (1, -1)]
+        pairs = [(l, r) for l, r in pairs if contains(A, l) and contains(B, r)]
+        return pairs and (lambda: rng.choice(pairs))
+    if op == '/':
+        # l = t * r must land in A, so r ranges over A / t (rounded inwards)
+        rs = [(-(-lo // t), hi // t) if t > 0 else (-(-hi // t), lo // t) for lo, hi in A]
+        rs = intersect(B, merge(iv for iv in rs if iv[0] <= iv[1]))
+        rs = clip(rs, -VALUE_LIMIT, -1) + clip(rs, 1, VALUE_LIMIT)
+        return rs and (lambda: (t * (r := pick(rs, rng)), r))
+    pairs = [(l, r) for l, r in powers(t) if contains(A, l) and contains(B, r)]
+    return pairs and (lambda: rng.choice(pairs))
+
+def push_down(tree, sets, i, t, rng=random):
+    """Sets node i to t and chooses ops and values for its whole subtree."""
+    tree.vals[i] = t
+    if tree.is_leaf(i): return
+    a, b = tree.left[i], tree.right[i]
+    options = [(op, s) for op in OPS if (s := choices(op, t, sets[a], sets[b], rng))]
+    op, sampler = rng.choice(options) # + or - always works: t is in this node's set
+    tree.set_op(i, op)
+    l, r = sampler()
+    push_down(tree, sets, a, l, rng)
+    push_down(tree, sets, b, r, rng)
+
+def generate_shape(n, tree=None, rng=random):
+    if tree is None: tree = FlatTree()
+    if n == 1:
+        tree.add_leaf()
+        return tree
+    split = catalan_split(n, rng)
+    left = generate_shape(split, tree, rng).root
+    right = generate_shape(n - split, tree, rng).root
+    tree.add_node('+', left, right) # operator is chosen top-down later
+    return tree
+
+def generate_targeted(stats=None, rng=random):
+    """Returns (numbers, target, solution) like test.generate_puzzle, counting shapes and puzzles in stats."""
+    while True:
+        tree = generate_shape(NUMBER_COUNT, rng=rng)
+        sets = reachable(tree)
+        targets = clip(sets[-1], *TARGET_RANGE)
+        if stats is not None: stats['attempts'] += 1
+        if targets: break # only empty for settings where no shape can reach TARGET_RANGE
+    push_down(tree, sets, tree.root, pick(targets, rng), rng)
+    if stats is not None: stats['puzzles'] += 1
+    return tree.leaves(), tree.val, str(tree)
+
+if __name__ == '__main__':
+    # usage: ./target_first.py [puzzles], compares against test.generate_puzzle's retry loop
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    stats = {'attempts': 0, 'puzzles': 0}
+    st = time.time()
+    for _ in range(n): generate_targeted(stats)
+    print(f"target-first: {n} puzzles in {time.time()-st:.2f}s, acceptance {stats['puzzles']/stats['attempts']:.1%}")
+    st, misses = time.time(), 0
+    for _ in range(n):
+        try: misses += generate_puzzle() is None
+        except ZeroDivisionError: misses += 1 # repair can leave a zero divisor behind
+    print(f"test.generate_puzzle: {n} calls in {time.time()-st:.2f}s, {misses} failed")
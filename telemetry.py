@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# per-question latency telemetry for the speed drills, in preallocated arrays
+# usage: ./telemetry.py <log>   per-operator percentiles for every session in a log
+import json, struct, sys, time
+from array import array
+from collections import defaultdict
+
+RECORD = struct.Struct('<Q8s8sqqHB')
+PERCENTILES = [50, 90, 99]
+
+class Telemetry:
+  def __init__(self, drill, path=None, capacity=4096):
+    self.drill, self.path = drill, path
+    self.session, self.origin = time.time_ns(), time.perf_counter_ns()
+    self.start, self.latency = array('q', bytes(8 * capacity)), array('q', bytes(8 * capacity))
+    self.misses, self.op, self.answered = array('H', bytes(2 * capacity)), array('B', bytes(capacity)), array('B', bytes(capacity))
+    self.n = 0
+    self.names, self.codes = [], {}
+    self.history = defaultdict(list) # op -> (latency, misses) of rows already flushed, for the report
+    self.t0 = self.wrong = 0
+
+  def ask(self): self.wrong, self.t0 = 0, time.perf_counter_ns()
+  def miss(self): self.wrong += 1
+
+  def answer(self, op, answered=True):
+    now, i = time.perf_counter_ns(), self.n
+    code = self.codes.get(op)
+    if code is None: code = self.codes[op] = len(self.names); self.names.append(op)
+    self.start[i], self.latency[i], self.misses[i] = self.t0 - self.origin, now - self.t0, min(self.wrong, 0xFFFF)
+    self.op[i], self.answered[i] = code, answered
+    self.n += 1
+    if self.n == len(self.latency): self.flush()
+
+  def rows(self):
+    for i in range(self.n):
+      yield {'session': self.session, 'drill': self.drill, 'op': self.names[self.op[i]], 'start_ns': self.start[i],
+             'latency_ns': self.latency[i], 'misses': self.misses[i], 'answered': bool(self.answered[i])}
+
+  def flush(self):
+    if self.path:
+      if self.path.endswith(('.ndjson', '.jsonl')):
+        with open(self.path, 'a') as f: f.writelines(json.dumps(row) + '\n' for row in self.rows())
+      else:
+        with open(self.path, 'ab') as f:
+          f.writelines(RECORD.pack(r['session'], r['drill'].encode()[:8], r['op'].encode()[:8], r['start_ns'], r['latency_ns'], r['misses'], r['answered']) for r in self.rows())
+    for row in self.rows():
+      if row['answered']: self.history[row['op']].append((row['latency_ns'], row['misses']))
+    self.n = 0
+
+  def close(self):
+    self.flush()
+    if self.history: report(self.history)
+
+def read(path):
+  """Every row in a log, as the dicts Telemetry.rows() yields."""
+  if path.endswith(('.ndjson', '.jsonl')):
+    with open(path) as f: yield from (json.loads(line) for line in f if line.strip())
+    return
+  with open(path, 'rb') as f: data = f.read()
+  for session, drill, op, start, latency, misses, answered in RECORD.iter_unpack(data[:len(data) // RECORD.size * RECORD.size]):
+    yield {'session': session, 'drill': drill.rstrip(b'\0').decode(), 'op': op.rstrip(b'\0').decode(),
+           'start_ns': start, 'latency_ns': latency, 'misses': misses, 'answered': bool(answered)}
+
+def report(history, file=sys.stdout):
+  """Prints count, latency percentiles (seconds) and misses per question for each op in {op: [(latency_ns, misses)]}."""
+  print(f"\n{'op':>6} {'n':>5} " + ' '.join(f'{f"p{p}":>6}' for p in PERCENTILES) + f" {'misses':>6}", file=file)
+  for op, rows in sorted(history.items()):
+    lat = sorted(l for l, _ in rows)
+    cols = ' '.join(f'{lat[min(len(lat) - 1, len(lat) * p // 100)] / 1e9:6.2f}' for p in PERCENTILES)
+    print(f'{op:>6} {len(rows):5} {cols} {sum(m for _, m in rows) / len(rows):6.2f}', file=file)
+
+if __name__ == '__main__':
+  # usage: ./telemetry.py <log> [drill]
+  history = defaultdict(list)
+  for row in read(sys.argv[1]):
+    if row['answered'] and (len(sys.argv) < 3 or row['drill'] == sys.argv[2]): history[row['op']].append((row['latency_ns'], row['misses']))
+  report(history)
@@ -0,0 +1,29 @@
+import random
+import numpy as np
+import pytest
+import batch_repair, bias_test
+
+def test_shape_probabilities():
+    for n in range(1, 7):
+        probs, is_leaf, position, left, right = batch_repair.shape_table(n)
+        assert probs.sum() == pytest.approx(1.0)
+        assert is_leaf.shape == (len(probs), 2 * n - 1) and (is_leaf.sum(1) == n).all()
+        assert (left < position).all() and (right < position).all()
+
+def test_batch_is_well_formed():
+    is_leaf, ops, vals, ok = batch_repair.generate_batch(1000, np.random.default_rng(0))
+    assert is_leaf.shape == vals.shape == (1000, 2 * bias_test.NUMBER_COUNT - 1) and ops.shape == (1000, bias_test.NUMBER_COUNT - 1)
+    keep = batch_repair.accepted(vals, ok)
+    op_counts, (leaf_values, _), targets = batch_repair.batch_stats(is_leaf, ops, vals, ok)
+    assert sum(op_counts.values()) == keep.sum() * (bias_test.NUMBER_COUNT - 1)
+    assert len(targets) == keep.sum() and ((bias_test.TARGET_RANGE[0] <= targets) & (targets <= bias_test.TARGET_RANGE[1])).all()
+
+def test_acceptance_matches_serial():
+    n = 20000
+    random.seed(1)
+    accepted = 0
+    for _ in range(n):
+        root = bias_test.evaluate_and_repair(bias_test.generate_skeleton(bias_test.NUMBER_COUNT))
+        accepted += bias_test.TARGET_RANGE[0] <= root <= bias_test.TARGET_RANGE[1]
+    _, _, vals, ok = batch_repair.generate_batch(n, np.random.default_rng(1))
+    assert batch_repair.accepted(vals, ok).mean() == pytest.approx(accepted / n, abs=0.01) # ~5 standard deviations
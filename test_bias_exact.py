@@ -0,0 +1,43 @@
+import random
+import pytest
+import bias_exact, bias_test
+
+COUNT, NUMBERS, TARGETS = 4, [2, 20], [10, 100]
+
+@pytest.fixture(scope='module')
+def analysis(): return bias_exact.Analysis(COUNT, NUMBERS, TARGETS).run()
+
+def test_distributions_are_normalised(analysis):
+    for k in range(1, COUNT + 1):
+        assert analysis.dist(k)[1].sum() + analysis.dropped[k] == pytest.approx(1.0)
+    assert analysis.targets[1].sum() == pytest.approx(1.0)
+    assert sum(analysis.ops.values()) == pytest.approx(COUNT - 1)
+    assert analysis.leaves[1].sum() == pytest.approx(COUNT)
+
+def test_matches_monte_carlo(analysis, monkeypatch):
+    monkeypatch.setattr(bias_test, 'NUMBER_RANGE', NUMBERS)
+    random.seed(2)
+    n, accepted, ops = 20000, 0, dict.fromkeys(bias_test.OPS, 0)
+    for _ in range(n):
+        tree = bias_test.generate_skeleton(COUNT)
+        if TARGETS[0] <= bias_test.evaluate_and_repair(tree) <= TARGETS[1]:
+            accepted += 1
+            for i in range(len(tree)):
+                if not tree.is_leaf(i): ops[tree.op(i)] += 1
+    assert analysis.accept == pytest.approx(accepted / n, abs=0.015) # ~5 standard deviations
+    for op, expected in analysis.ops.items(): assert ops[op] / accepted == pytest.approx(expected, abs=0.05)
+
+def test_to_stats(analysis):
+    stats = analysis.to_stats(1000)
+    assert stats.samples == 1000 and stats.attempts == round(1000 / analysis.accept)
+    assert abs(stats.targets.total() - 1000) < 50 # per-value rounding
+
+def test_pruning_drops_at_most_epsilon(analysis):
+    pruned = bias_exact.Analysis(COUNT, NUMBERS, TARGETS, epsilon=1e-3).run()
+    for k in range(2, COUNT + 1):
+        assert 0 < pruned.dropped[k] <= 1e-3 and len(pruned.dist(k)[0]) < len(analysis.dist(k)[0])
+    assert pruned.accept == pytest.approx(analysis.accept, abs=COUNT * 1e-3)
+
+def test_refuses_huge_grids(monkeypatch):
+    monkeypatch.setattr(bias_exact, 'MAX_CELLS', 1000)
+    with pytest.raises(ValueError, match='cells'): bias_exact.Analysis(3, [6, 100], TARGETS).run()
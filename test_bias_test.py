@@ -0,0 +1,20 @@
+import math, random
+import bias_test
+
+def test_values_stay_exact_past_int64():
+    tree = bias_test.generate_skeleton(12, rng=random.Random(0))
+    for i in range(len(tree)):
+        if not tree.is_leaf(i): tree.set_op(i, '*')
+    value = bias_test.evaluate_and_repair(tree, random.Random(0))
+    assert value == math.prod(tree.leaves(tree.root)) > 2**63 # int64 storage would have zeroed this tree
+
+def test_checkpoint_resume_matches_uninterrupted(tmp_path, monkeypatch):
+    monkeypatch.setattr(bias_test, 'CHECKPOINT_CHUNK', 50)
+    monkeypatch.setenv('SEED', '7')
+    resumed, straight = str(tmp_path / 'resumed.json'), str(tmp_path / 'straight.json')
+    bias_test.run_checkpointed(resumed, 100)
+    assert bias_test.load_checkpoint(resumed)[0].samples == 100 and (tmp_path / 'resumed.png').exists()
+    bias_test.run_checkpointed(resumed, 250) # picks up at task 2
+    bias_test.run_checkpointed(straight, 250)
+    (a, seed_a, tasks_a), (b, seed_b, tasks_b) = bias_test.load_checkpoint(resumed), bias_test.load_checkpoint(straight)
+    assert a.samples == 250 and (seed_a, tasks_a) == (seed_b, tasks_b) == (7, 5) and a.to_dict() == b.to_dict()
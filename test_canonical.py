@@ -0,0 +1,32 @@
+from canonical import Canon, dedupe, parse, same
+from flat_tree import FlatTree
+
+def test_parse():
+  assert parse('(3 - 1) * 4') == ('*', ('-', 3, 1), 4)
+  assert parse('-(2 + 3)') == ('-', 0, ('+', 2, 3)) and parse('-2 ** 2') == ('-', 0, ('**', 2, 2))
+  assert parse('(-2) ** 2') == ('**', -2, 2)
+
+def test_reordering_and_regrouping():
+  assert same('1 + 2 + 3', '3 + (2 + 1)')
+  assert same('8 - (3 - 1)', '8 + 1 - 3')
+  assert same('12 / (6 / 2)', '12 * 2 / 6')
+  assert same('(2 * 3) * 4', '4 * (3 * 2)')
+
+def test_different_expressions():
+  assert not same('8 - 3', '3 - 8')
+  assert not same('2 ** 3', '3 ** 2')
+  assert not same('2 * (3 + 4)', '2 * 3 + 4')
+  assert not same('(2 + 3) * 4', '2 + 3 * 4')
+
+def test_shared_table_and_trees():
+  table, tree = Canon(), FlatTree()
+  tree.add_node('+', tree.add_leaf(2), tree.add_leaf(3))
+  assert same(tree, ('+', 3, 2), table) and same('3 + 2', tree, table)
+  size = len(table)
+  table.add(parse('2 + 3'))
+  assert len(table) == size # already interned
+  assert table.canonical('3 + 2') == table.canonical('2 + 3')
+
+def test_dedupe():
+  puzzles = [([2, 3], 5, ('+', 2, 3)), ([3, 2], 5, ('+', 3, 2)), ([2, 3], 6, ('*', 2, 3))]
+  assert list(dedupe(puzzles)) == [puzzles[0], puzzles[2]]
@@ -0,0 +1,27 @@
+import sympy
+from complexity import LRU, Complexity
+
+x, y = sympy.symbols('x y')
+
+def test_counts():
+  c = Complexity()
+  assert c.count(x) == (1, 0)
+  assert c.count(x + y) == (3, 1)
+  assert c.count(sympy.sin(x) * y + 2) == (6, 3) # Add(Integer, Mul(sin(x), y))
+  assert c.count(x + y) == (3, 1) and c.counts.hits
+
+def test_simplify_and_opacity():
+  c = Complexity()
+  raw = sympy.sin(x) ** 2 + sympy.cos(x) ** 2
+  assert c.simplify(raw) == 1
+  assert c.opacity(raw, sympy.Integer(1)) == (c.nodes(raw) - 1) / c.nodes(raw)
+  assert c.opacity(raw, raw) == 0
+
+def test_lru_evicts_by_size():
+  lru = LRU(capacity=10)
+  lru.put('a', 1, 4); lru.put('b', 2, 4)
+  lru.get('a') # b is now the least recently used
+  lru.put('c', 3, 4)
+  assert lru.get('b') is None and lru.get('a') == 1 and lru.get('c') == 3 and lru.size == 8
+  lru.put('big', 4, 50) # larger than the capacity, still kept on its own
+  assert len(lru) == 1 and lru.get('big') == 4
@@ -0,0 +1,46 @@
+from flat_tree import FlatTree, LEAF, TreeStore
+
+def build():
+  """(3 - 1) * 4 in postfix order."""
+  tree = FlatTree()
+  a, b = tree.add_leaf(3), tree.add_leaf(1)
+  sub = tree.add_node('-', a, b)
+  tree.add_node('*', sub, tree.add_leaf(4))
+  return tree
+
+def test_evaluate_and_render():
+  tree = build()
+  assert tree.evaluate() == 8 and tree.val == 8 and tree.vals[2] == 2
+  assert str(tree) == '((3 - 1) * 4)'
+  assert tree.leaves() == [3, 1, 4] and tree.leaves(2) == [3, 1]
+  assert tree.start(2) == 0 and tree.start(3) == 3 and tree.start(tree.root) == 0
+
+def test_node_view():
+  tree = build()
+  root = tree[tree.root]
+  assert root.op == '*' and root.left.op == '-' and root.right.is_leaf and root.right.val == 4
+  root.left.op = '+'
+  assert tree.evaluate() == 16 and tree.op_codes() == [0, 2]
+  assert [n.is_leaf for n in tree] == [op == LEAF for op in tree.ops]
+
+def test_list_values():
+  tree = FlatTree(vals=[])
+  tree.add_node('/', tree.add_leaf(1), tree.add_leaf(3))
+  assert tree.evaluate(lambda op, l, r: l / r) == 1 / 3
+
+def test_tree_store():
+  store, trees = TreeStore(), [build(), FlatTree()]
+  trees[1].add_leaf(7)
+  for tree in trees: store.append(tree)
+  assert len(store) == 2
+  assert str(store[0]) == str(trees[0]) and store[0].evaluate() == 8
+  assert store[1].leaves() == [7]
+
+def test_more_than_256_nodes():
+  tree = FlatTree()
+  root = tree.add_leaf(1)
+  for i in range(300): root = tree.add_node('+', root, tree.add_leaf(1))
+  assert len(tree) == 601 and tree.evaluate() == 301 and tree.leaves(tree.root) == [1] * 301
+  store = TreeStore()
+  store.append(tree)
+  assert store[0].evaluate() == 301 and str(store[0]) == str(tree)
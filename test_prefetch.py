@@ -0,0 +1,59 @@
+import itertools, threading, time
+import pytest
+from prefetch import Prefetcher
+
+def wait_for(condition, timeout=5):
+  deadline = time.monotonic() + timeout
+  while not condition():
+    assert time.monotonic() < deadline, 'timed out'
+    time.sleep(0.001)
+
+def counter():
+  calls = itertools.count()
+  return calls, lambda: next(calls)
+
+def test_fills_then_refills_at_watermark():
+  calls, generate = counter()
+  with Prefetcher(generate, depth=4, refill=1) as prefetcher:
+    wait_for(prefetcher.queue.full)
+    time.sleep(0.05)
+    assert prefetcher.queue.qsize() == 4 and not prefetcher.wake.is_set() # asleep once full
+    assert [prefetcher.get(), prefetcher.get()] == [0, 1]
+    time.sleep(0.05)
+    assert prefetcher.queue.qsize() == 2 # above the watermark, not woken
+    assert prefetcher.get() == 2 # leaves 1, wakes the thread
+    wait_for(prefetcher.queue.full)
+    assert [prefetcher.get() for _ in range(4)] == [3, 4, 5, 6]
+
+def test_skips_none():
+  calls = itertools.count()
+  with Prefetcher(lambda: i if (i := next(calls)) % 2 else None, depth=3, refill=1) as prefetcher:
+    assert [prefetcher.get() for _ in range(5)] == [1, 3, 5, 7, 9]
+
+def test_errors_reach_get():
+  def generate():
+    if (i := next(calls)) == 2: raise ValueError('boom')
+    return i
+  calls = itertools.count()
+  with Prefetcher(generate, depth=4, refill=1) as prefetcher:
+    assert [prefetcher.get(), prefetcher.get()] == [0, 1]
+    with pytest.raises(ValueError, match='boom'): prefetcher.get()
+    wait_for(lambda: not prefetcher.thread.is_alive())
+
+def test_never_stalls_when_gets_race_the_refill():
+  # a get() landing between the thread's last put and its wake.clear() must still get a refill
+  calls, generate = counter()
+  got = []
+  with Prefetcher(generate, depth=2, refill=1) as prefetcher:
+    reader = threading.Thread(target=lambda: got.extend(prefetcher.get() for _ in range(20000)), daemon=True)
+    reader.start()
+    reader.join(timeout=30)
+    assert not reader.is_alive(), 'get() blocked with nothing being generated'
+  assert got == list(range(20000))
+
+def test_close_stops_the_thread():
+  calls, generate = counter()
+  prefetcher = Prefetcher(generate, depth=2, refill=0)
+  wait_for(prefetcher.queue.full)
+  prefetcher.close()
+  assert not prefetcher.thread.is_alive()
@@ -0,0 +1,41 @@
+import random
+from fractions import Fraction
+from puzzle_bank import Bank, append, decode, encode, index
+from twentyfour import apply, generate_puzzle
+
+def value(tree):
+  if isinstance(tree, int): return Fraction(tree)
+  op, l, r = tree
+  return apply(op, value(l), value(r))
+
+def test_encode_round_trip():
+  tree = ('*', ('-', 30, 6), ('**', 2, ('/', 4, 2)))
+  assert decode(encode(96, tree)) == ([30, 6, 2, 4, 2], 96, tree)
+
+def test_bank(tmp_path):
+  random.seed(0)
+  path, puzzles = str(tmp_path / 'bank'), []
+  while len(puzzles) < 200:
+    if p := generate_puzzle(): puzzles.append(p)
+  assert append(path, puzzles) == 200
+  index(path)
+  bank = Bank(path)
+  try:
+    assert len(bank) == 200
+    assert [bank[i][1:] for i in range(200)] == [p[1:] for p in puzzles]
+    for _ in range(50):
+      numbers, target, tree = bank.sample(5)
+      assert value(tree) == target and len(numbers) == 5
+    target = puzzles[0][1]
+    assert all(bank.sample(5, target)[1] == target for _ in range(10))
+    assert sorted(bank.targets(5)) == sorted({p[1] for p in puzzles})
+    assert bank.sample(4) is None and bank.sample(5, 10**6) is None
+  finally: bank.close()
+
+def test_empty_bank(tmp_path):
+  path = str(tmp_path / 'bank')
+  open(path, 'wb').close()
+  index(path)
+  bank = Bank(path)
+  try: assert len(bank) == 0 and bank.sample() is None and bank.sample(5) is None and bank.counts == {}
+  finally: bank.close()
@@ -0,0 +1,34 @@
+import time
+import pytest
+from sandbox import Sandbox
+
+@pytest.fixture(scope='module')
+def sandbox():
+  with Sandbox(workers=1, timeout=0.3, memory_mb=512) as sandbox: yield sandbox
+
+def test_call(sandbox):
+  assert sandbox.call(pow, 2, 10) == 1024
+  with pytest.raises(ValueError): sandbox.call(int, 'x')
+  assert sandbox.call(pow, 3, 2) == 9 # the worker survives fn raising
+
+def test_timeout_replaces_worker(sandbox):
+  st = time.monotonic()
+  with pytest.raises(TimeoutError): sandbox.call(time.sleep, 10)
+  assert time.monotonic() - st < 2
+  assert sandbox.call(pow, 2, 3, timeout=5) == 8 # waits for the respawned worker
+
+def test_memory_limit(sandbox):
+  with pytest.raises(MemoryError): sandbox.call(bytearray, 2**30, timeout=5)
+  assert sandbox.call(pow, 2, 4, timeout=5) == 16
+
+def test_unpicklable_call_keeps_worker(sandbox):
+  for _ in range(3): # more than workers, each failure must hand back or replace the worker
+    with pytest.raises(Exception): sandbox.call(lambda: 1)
+  assert sandbox.call(pow, 2, 5, timeout=5) == 32
+
+def test_close_stops_respawns():
+  sandbox = Sandbox(workers=1, timeout=0.1, memory_mb=512)
+  with pytest.raises(TimeoutError): sandbox.call(time.sleep, 10)
+  sandbox.close() # a respawn is in flight
+  assert not any(t.is_alive() for t in sandbox.respawning) and list(sandbox.idle.queue) == [None] # only the wake-up is left
+  with pytest.raises(RuntimeError): sandbox.call(pow, 2, 2)
@@ -0,0 +1,27 @@
+import pytest
+import seeds
+
+def test_derive_is_stable_and_keyed():
+  assert seeds.derive(5, 1) == seeds.derive(5, 1)
+  assert len({seeds.derive(5), seeds.derive(5, 0), seeds.derive(5, 1), seeds.derive(6, 1), seeds.derive(5, seeds.SPAWN, 1)}) == 5
+  assert seeds.spawn(5, 3) == [seeds.derive(5, seeds.SPAWN, i) for i in range(3)]
+
+def test_streams_repeat():
+  assert [seeds.stream(7, 2).random() for _ in range(2)] == [seeds.stream(7, 2).random()] * 2
+
+def test_at_retries_in_its_own_stream():
+  def generate(rng): return x if (x := rng.randrange(4)) else None
+  assert seeds.at(generate, 9, 3) == seeds.at(generate, 9, 3)
+  assert len({seeds.at(lambda rng: rng.random(), 9, i) for i in range(10)}) == 10
+
+def test_id_round_trip():
+  for seed, index in [(0, 0), (0x1f, 4), (2**64 - 1, 123456)]:
+    assert seeds.parse_id(seeds.format_id(seed, index)) == (seed, index)
+  assert seeds.parse_id(' 1f-4\n') == (0x1f, 4)
+  with pytest.raises(ValueError): seeds.parse_id('nodash')
+
+def test_root_seed_from_env(monkeypatch):
+  monkeypatch.setenv('SEED', '0x1f')
+  assert seeds.root_seed() == 0x1f
+  monkeypatch.setenv('SEED', '31')
+  assert seeds.root_seed() == 31
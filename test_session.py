@@ -0,0 +1,31 @@
+import io, os, time
+import pytest
+from session import Session
+
+@pytest.fixture
+def pipe():
+  r, w = os.pipe()
+  with os.fdopen(r, 'rb', buffering=0) as reader: yield reader, w
+  try: os.close(w)
+  except OSError: pass
+
+def test_lines(pipe):
+  reader, w = pipe
+  os.write(w, b'12\n34\r\n5')
+  os.close(w)
+  out = io.StringIO()
+  with Session(5, reader, out) as session:
+    assert [session.input('? ') for _ in range(3)] == ['12', '34', '5']
+    with pytest.raises(EOFError): session.input()
+  assert out.getvalue() == '? ' * 3
+
+def test_deadline(pipe):
+  reader, _ = pipe
+  session, st = Session(0.2, reader, io.StringIO()), time.monotonic()
+  with pytest.raises(TimeoutError): session.input()
+  assert 0.15 < time.monotonic() - st < 1 and session.remaining() == 0
+
+def test_question_timeout(pipe):
+  reader, _ = pipe
+  session = Session(5, reader, io.StringIO())
+  assert session.input(timeout=0.1) is None and session.remaining() > 4
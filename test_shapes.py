@@ -0,0 +1,28 @@
+import random
+from collections import Counter
+from shapes import all_shapes, count, rank, sample, to_tree, unrank
+
+def test_catalan_counts():
+  assert [count(n) for n in range(1, 9)] == [1, 1, 2, 5, 14, 42, 132, 429]
+
+def test_rank_unrank_round_trip():
+  for n in range(1, 8):
+    words = list(all_shapes(n))
+    assert [rank(w) for w in words] == list(range(count(n)))
+    assert len({tuple(w) for w in words}) == count(n)
+
+def test_words_are_valid_postfix():
+  for word in all_shapes(6):
+    depth = 0
+    for leaf in word: depth += 1 if leaf else -1; assert depth >= 1
+    assert depth == 1
+
+def test_sample_is_uniform():
+  rng, n, draws = random.Random(0), 5, 14000
+  seen = Counter(rank(sample(n, rng)) for _ in range(draws))
+  assert sorted(seen) == list(range(count(n)))
+  assert all(abs(c - draws / count(n)) < 150 for c in seen.values()) # ~4.5 standard deviations
+
+def test_to_tree():
+  assert to_tree(unrank(3, 0), [1, 2, 3], ['+', '*']) == ('*', 1, ('+', 2, 3))
+  assert to_tree(unrank(3, 1), [1, 2, 3], ['+', '*']) == ('*', ('+', 1, 2), 3)
@@ -0,0 +1,54 @@
+import itertools, random
+from fractions import Fraction
+import pytest, sympy
+from solver import Solver
+from twentyfour import OPS, apply, combine
+
+def brute(nums):
+  """value -> number of ordered trees using every number once (leaves labelled by position)."""
+  def go(items):
+    if len(items) == 1: return {Fraction(nums[items[0]]): 1}
+    out = {}
+    for r in range(1, len(items)):
+      for left in itertools.combinations(items, r):
+        right = tuple(i for i in items if i not in left)
+        L, R = go(left), go(right)
+        for op in OPS:
+          for a, ca in L.items():
+            for b, cb in R.items():
+              if (v := combine(op, a, b)) is not None: out[v] = out.get(v, 0) + ca * cb
+    return out
+  return go(tuple(range(len(nums))))
+
+def value(tree):
+  if isinstance(tree, int): return Fraction(tree)
+  op, l, r = tree
+  return apply(op, value(l), value(r))
+
+CASES = [[1, 2, 3], [4, 4, 10, 10], [0, 2, 5], [-1, 3, 3, 7], [2, 3, 4, 5], [1, 1, 2, 12], [1, 2, 8, 9], [-8, 2, 3]] # the last two take roots
+
+@pytest.mark.parametrize('numbers', CASES)
+@pytest.mark.parametrize('enumerate_upto', [1, 3]) # 1 sends every subset through the target-first path
+def test_counts_match_brute_force(numbers, enumerate_upto):
+  expected = brute(numbers)
+  solver = Solver(numbers)
+  solver.enumerate_upto = enumerate_upto
+  targets = set(random.Random(0).sample(sorted(expected), min(40, len(expected)))) | {0, 1, -1, 24, 7, Fraction(1, 3)}
+  for t in targets: assert solver.trees(solver.full, Fraction(t)) == expected.get(t, 0), t
+
+def test_reachable_matches_brute_force():
+  assert Solver([2, 3, 4, 5]).reachable() == set(brute([2, 3, 4, 5]))
+
+def test_count_ignores_duplicate_orderings():
+  assert Solver([4, 4, 10, 10]).count(24) == brute([4, 4, 10, 10])[24] // 4
+
+def test_solutions_evaluate_to_target():
+  solver = Solver([3, 8, 8, 12, 50])
+  for target in (24, 100, 377):
+    assert value(solver.tree(solver.full, target)) == target
+    shortest = solver.shortest(target)
+    assert shortest is not None and sympy.sympify(shortest) == target
+
+def test_unsolvable():
+  solver = Solver([1, 1, 1])
+  assert solver.count(24) == 0 and solver.solution(24) is None and solver.shortest(24) is None
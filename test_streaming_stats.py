@@ -0,0 +1,39 @@
+import json, random
+import pytest
+from streaming_stats import Histogram, Moments, SampleStats
+
+def fill(stats, targets):
+  for t in targets: stats.add_target(t)
+  return stats
+
+def test_histogram_bins():
+  h = Histogram(0, 10, 5) # hi is exclusive
+  for x in (-1, 0, 1, 2, 9, 10): h.add(x)
+  assert list(h.counts) == [2, 1, 0, 0, 1] and (h.under, h.over) == (1, 1) and h.total() == 6
+
+def test_moments():
+  xs = [random.Random(0).uniform(-5, 5) for _ in range(1000)]
+  m = Moments()
+  for x in xs: m.add(x)
+  mean = sum(xs) / len(xs)
+  assert m.mean == pytest.approx(mean)
+  assert m.std == pytest.approx((sum((x - mean) ** 2 for x in xs) / len(xs)) ** 0.5)
+  assert (m.min, m.max) == (min(xs), max(xs))
+
+def test_merge_equals_one_pass():
+  rng = random.Random(1)
+  targets = [rng.randint(10, 400) for _ in range(3000)]
+  whole = fill(SampleStats([2, 100], [10, 400]), targets)
+  left, right = fill(SampleStats([2, 100], [10, 400]), targets[:1234]), fill(SampleStats([2, 100], [10, 400]), targets[1234:])
+  left.merge(right)
+  assert left.samples == whole.samples and list(left.targets.counts) == list(whole.targets.counts)
+  assert left.target_moments.mean == pytest.approx(whole.target_moments.mean)
+  assert left.target_moments.std == pytest.approx(whole.target_moments.std)
+
+def test_dict_round_trip(tmp_path):
+  stats = fill(SampleStats([2, 100], [10, 400]), [10, 50, 400])
+  stats.ops['+'] += 3; stats.leaves.add(7); stats.attempts = 9
+  again = SampleStats.from_dict(stats.to_dict())
+  assert again.to_dict() == stats.to_dict()
+  stats.snapshot(str(tmp_path / 'stats.json'))
+  assert SampleStats.from_dict(json.loads((tmp_path / 'stats.json').read_text())).to_dict() == stats.to_dict()
@@ -0,0 +1,49 @@
+import io
+import pytest
+from telemetry import Telemetry, read, report
+
+OPS = ['+', '-', '*', '+', 'divide_by']
+
+def record(path, capacity=16):
+  t = Telemetry('zetamac_long', path, capacity)
+  for i, op in enumerate(OPS):
+    t.ask()
+    for _ in range(i % 3): t.miss()
+    t.answer(op, answered=i != 3)
+  return t
+
+@pytest.mark.parametrize('name', ['log.bin', 'log.ndjson'])
+def test_log_reads_back(tmp_path, name):
+  path = str(tmp_path / name)
+  t = record(path)
+  rows = list(t.rows())
+  t.flush()
+  got = list(read(path))
+  if name == 'log.bin': # names are cut to 8 bytes
+    for row in rows: row['drill'], row['op'] = row['drill'][:8], row['op'][:8]
+  assert got == rows
+  assert [r['misses'] for r in got] == [0, 1, 2, 0, 1] and [r['answered'] for r in got] == [True] * 3 + [False, True]
+  assert all(r['session'] == t.session and r['latency_ns'] >= 0 for r in got)
+
+def test_full_buffer_flushes(tmp_path):
+  path = str(tmp_path / 'log.bin')
+  t = record(path, capacity=2)
+  assert t.n == 1 and len(list(read(path))) == 4
+  t.flush()
+  record(path).flush() # a second session appends
+  rows = list(read(path))
+  assert [r['op'] for r in rows] == ['+', '-', '*', '+', 'divide_b', '+', '-', '*', '+', 'divide_b']
+  assert len({r['session'] for r in rows}) == 2
+
+def test_history_skips_unanswered():
+  t = record(None)
+  t.flush()
+  assert sorted(t.history) == ['*', '+', '-', 'divide_by'] and len(t.history['+']) == 1
+
+def test_report_percentiles():
+  out = io.StringIO()
+  report({'+': [(s * 10**9, s % 2) for s in range(1, 11)], '*': [(5 * 10**8, 3)]}, out)
+  lines = out.getvalue().split('\n')[1:]
+  assert lines[0].split() == ['op', 'n', 'p50', 'p90', 'p99', 'misses']
+  assert lines[1].split() == ['*', '1', '0.50', '0.50', '0.50', '3.00']
+  assert lines[2].split() == ['+', '10', '6.00', '10.00', '10.00', '0.50']
@@ -0,0 +1,60 @@
+from fractions import Fraction as F
+import pytest
+from twentyfour import MAX_VALUE, apply, build_expression, check_answer, combine, iroot, judge, parse_answer, power
+
+def test_iroot():
+  assert [iroot(x, 2) for x in (0, 1, 4, 5, 144, 10**40)] == [0, 1, 2, None, 12, 10**20]
+  assert iroot(27, 3) == 3 and iroot(2**64, 64) == 2 and iroot(3**50 + 1, 50) is None
+  assert iroot(7, 3) is None # 1 < root < 2
+
+def test_power_rational_roots():
+  assert power(F(8, 27), F(2, 3)) == F(4, 9)
+  assert power(F(16), F(-1, 2)) == F(1, 4)
+  assert power(F(2), F(1, 2)) is None and power(F(1, 2), F(1, 2)) is None
+
+def test_power_negative_base():
+  assert power(F(-2), F(3)) == -8 and power(F(-2), F(-1)) == F(-1, 2)
+  assert power(F(-8), F(1, 3)) is None # principal root is complex
+  assert power(F(-4), F(1, 2)) is None
+
+def test_power_zero_base():
+  assert power(F(0), F(-1)) is None and power(F(0), F(-1, 2)) is None
+  assert power(F(0), F(0)) == 1 and power(F(0), F(3)) == 0
+
+def test_apply():
+  assert apply('/', F(1), F(3)) == F(1, 3) and apply('/', F(1), F(0)) is None
+  assert apply('-', F(2), F(5)) == -3 and apply('**', F(4), F(1, 2)) == 2
+
+def test_limits():
+  assert build_expression([2, 11], ['**']) is None # |exponent| > 10
+  assert build_expression([21, 2], ['**']) is None # base > 20
+  assert build_expression([2, 10], ['**']) == (1024, ('**', 2, 10))
+  assert build_expression([1000, 1001], ['*']) is None # over MAX_VALUE
+
+def test_combine():
+  assert combine('**', F(2), F(11)) is None and combine('**', F(2), F(-11)) is None
+  assert combine('**', F(21), F(2)) is None and combine('**', F(-30), F(2)) == 900 # only large positive bases are cut
+  assert combine('**', F(4), F(-1, 2)) == F(1, 2) and combine('**', F(-8), F(1, 3)) is None
+  assert combine('**', F(0), F(-2)) is None and combine('/', F(1), F(0)) is None
+  assert combine('*', F(1000), F(1000)) == MAX_VALUE and combine('+', F(10**6), F(1)) is None
+  assert combine('-', F(0), F(10**7)) == -10**7 # only the upper limit is checked
+
+def test_parse_answer():
+  assert parse_answer('(2 + 3) * -4') == ('*', ('+', 2, 3), ('-', 0, 4))
+  assert parse_answer(' 2 ** 3 / 4 ') == ('/', ('**', 2, 3), 4)
+  for bad in ['2.5 * 4', 'x + 1', '2 // 3', '(1).__class__', 'print(1)', '2 +', '+2', '(' * 1000 + '1' + ')' * 1000]:
+    with pytest.raises(ValueError): parse_answer(bad)
+
+def test_judge_never_evaluates_python():
+  called = []
+  answer = "__import__('os').getpid() - __import__('os').getpid() + 2+3+5+7+9"
+  with pytest.raises(ValueError): judge(answer, [2, 3, 5, 7, 9], 26, lambda tree, target: called.append(tree))
+  assert called == []
+
+def test_judge():
+  assert judge('(2 + 3) * 4 + 4', [2, 3, 4, 4], 24) == (True, 'Correct!')
+  assert judge('2 * 3 * 4 / 4', [2, 3, 4, 4], 24) == (False, 'Incorrect (got 6, want 24)')
+  assert judge('4 / (2 - 2) + 3', [2, 2, 3, 4], 24) == (False, 'Incorrect (got undefined, want 24)')
+  assert judge('2 ** 99 + 1', [1, 2, 99], 24) == (False, 'Incorrect (got undefined, want 24)') # the ** guard, not a huge power
+  assert judge('1 + 2', [1, 3], 3)[0] is False
+  assert check_answer(('-', 0, 24), -24, timed=True)[:2] == ('-24', True)
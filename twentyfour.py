@@ -1,68 +1,192 @@
 #!/usr/bin/env python3
-import ast, math, random, re, readline, signal, sys
-from sympy import parse_expr
+import ast, os, random, re, readline, sys, time
+from fractions import Fraction
+import seeds
+from profiler import from_env
+from shapes import splits
 
 OPS = ['+', '-', '*', '/', '**']
+AST_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**'}
 TARGET_RANGE = [10,400]
 NUMBER_RANGE = [2,100]
 NUMBER_COUNT = 5
+MAX_VALUE = 1e6
+PREFETCH_DEPTH = 8 # puzzles kept ready
+PREFETCH_REFILL = 2 # top the queue up again at this many
+SANDBOX_WORKERS = 2
+SANDBOX_TIMEOUT = 0.5 # seconds per answer check
+SANDBOX_MEMORY_MB = 1024
 
-class Timeout:
-  def __enter__(self, *a): signal.signal(signal.SIGALRM, self.h); signal.setitimer(signal.ITIMER_REAL, 0.5)
-  def __exit__(self, *a): signal.setitimer(signal.ITIMER_REAL, 0)
-  def h(self, *a): raise TimeoutError('TLE')
+profile = from_env() # None unless PROFILE is set, see profiler.py
 
-def catalan(n:int): return math.comb(2*n, n) // (n+1)
+def iroot(x:int, k:int) -> int|None:
+  """Exact integer k-th root of x >= 0, or None if x is not a perfect k-th power."""
+  if x < 2: return x
+  if x.bit_length() <= k: return None # 1 < root < 2
+  r = 1 << -(-x.bit_length() // k) # Newton's method from above
+  while (s := ((k - 1) * r + x // r ** (k - 1)) // k) < r: r = s
+  return r if r ** k == x else None
 
-def generate_expression(nums:list[int], required_ops:list[str]) -> str|None:
-  if len(nums) == 1: return str(nums[0])
+def power(base:Fraction, exp:Fraction) -> Fraction|None:
+  """Exact base**exp when it is rational (and finite), otherwise None."""
+  if base == 0: return None if exp < 0 else Fraction(exp == 0)
+  if exp.denominator == 1: return base ** exp.numerator
+  if base < 0: return None # principal root of a negative base is complex
+  num, den = iroot(base.numerator, exp.denominator), iroot(base.denominator, exp.denominator)
+  if num is None or den is None: return None
+  return Fraction(num, den) ** exp.numerator
 
-  n = len(nums) - 1
-  weights = [catalan(k - 1) * catalan(n - k) for k in range(1, len(nums))]
-  split = random.choices(range(1, len(nums)), weights=weights)[0]
-  left = generate_expression(nums[:split], required_ops)
-  right = generate_expression(nums[split:], required_ops)
-  if (left is None) or (right is None): return None
+def apply(op:str, l:Fraction, r:Fraction) -> Fraction|None:
+  if op == '+': return l + r
+  if op == '-': return l - r
+  if op == '*': return l * r
+  if op == '/': return l / r if r else None
+  return power(l, r)
 
-  op = required_ops.pop() if required_ops else random.choice(OPS)
-  expression = f'({left} {op} {right})'
-  if op == '**' and (parse_expr(left) > 20 or parse_expr(right) > 10): return None
+def combine(op:str, l:Fraction, r:Fraction) -> Fraction|None:
+  """Applies op with the generator's playability limits, None if the result is rejected."""
+  if op == '**' and (l > 20 or abs(r) > 10): return None
+  value = apply(op, l, r)
+  return None if value is None or value > MAX_VALUE else value
 
-  with Timeout(): evaluated = parse_expr(expression)
-  if not evaluated.is_rational: return None
-  if evaluated > 1e6: return None
+def rejection(op:str, l:Fraction, r:Fraction) -> str:
+  """Why combine(op, l, r) returned None, only worked out when profiling."""
+  if op == '**' and (l > 20 or abs(r) > 10): return 'pow_guard'
+  return 'undefined' if apply(op, l, r) is None else 'too_large'
 
-  return expression
+def build_expression(nums:list[int], required_ops:list[str], rng=random) -> tuple[Fraction, int|tuple]|None:
+  """Returns (exact value, tree) where a tree is a leaf int or an (op, left, right) tuple."""
+  if len(nums) == 1: return Fraction(nums[0]), nums[0]
+
+  sizes, cum_weights = splits(len(nums))
+  split = rng.choices(sizes, cum_weights=cum_weights)[0]
+  left = build_expression(nums[:split], required_ops, rng)
+  if left is None: return None
+  right = build_expression(nums[split:], required_ops, rng)
+  if right is None: return None
+
+  op = required_ops.pop() if required_ops else rng.choice(OPS)
+  value = combine(op, left[0], right[0])
+  if value is None:
+    if profile: profile.last = f'{rejection(op, left[0], right[0])}/{op}'
+    return None
+
+  return value, (op, left[1], right[1])
+
+def render(tree:int|tuple) -> str:
+  if isinstance(tree, int): return str(tree)
+  op, left, right = tree
+  return f'({render(left)} {op} {render(right)})'
+
+def generate_expression(nums:list[int], required_ops:list[str], rng=random) -> str|None:
+  built = build_expression(nums, required_ops, rng)
+  return None if built is None else render(built[1])
+
+def parse_answer(user_input:str) -> int|tuple:
+  """The player's expression as a tree, built from the ast without evaluating anything.
+  Only int literals, + - * / ** and unary minus (-x becomes (0 - x)) are accepted, anything else is a ValueError."""
+  def walk(n):
+    if isinstance(n, ast.Constant) and type(n.value) is int: return n.value
+    if isinstance(n, ast.BinOp) and type(n.op) in AST_OPS: return AST_OPS[type(n.op)], walk(n.left), walk(n.right)
+    if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.USub): return '-', 0, walk(n.operand)
+    raise ValueError('only whole numbers, + - * / ** and parentheses are allowed')
+  try: return walk(ast.parse(user_input.strip(), mode='eval').body)
+  except (SyntaxError, RecursionError): raise ValueError('not an expression') from None
+
+def evaluate(tree:int|tuple) -> Fraction|None:
+  """Exact value of a tree, None if a step is undefined or breaks the ** guard (so it can't blow up)."""
+  if isinstance(tree, int): return Fraction(tree)
+  op, l, r = tree
+  l, r = evaluate(l), evaluate(r)
+  if l is None or r is None or op == '**' and (l > 20 or abs(r) > 10): return None
+  return apply(op, l, r)
+
+def check_answer(tree:int|tuple, target:int, timed:bool=False) -> tuple[str, bool]|tuple[str, bool, dict]:
+  """Evaluates a parse_answer tree exactly and compares it with target; can run inside a Sandbox.
+  timed=True adds {stage: ns} for the evaluation."""
+  st = time.perf_counter_ns()
+  value = evaluate(tree)
+  shown, correct = 'undefined' if value is None else str(value), value == target
+  if not timed: return shown, correct
+  return shown, correct, {'evaluate': time.perf_counter_ns() - st}
+
+def judge(user_input:str, numbers:list[int], target:int, check=check_answer) -> tuple[bool, str]:
+  """(correct, message) for an answer to the sorted numbers; check(tree, target) does the evaluation.
+  Raises ValueError if the answer isn't a plain arithmetic expression."""
+  user_numbers = sorted([int(s) for s in re.split(r'\D+', user_input) if s])
+  if user_numbers != numbers: return False, f'Wrong numbers. Used {user_numbers}, needed {numbers}'
+  evaluated_input, correct = check(parse_answer(user_input), target)
+  return correct, 'Correct!' if correct else f'Incorrect (got {evaluated_input}, want {target})'
+
+def generate_puzzle(rng=random) -> tuple[list[int], int, int|tuple]|None:
+  """Returns (numbers, target, solution tree) or None if every retry missed TARGET_RANGE."""
+  numbers = [rng.randint(*NUMBER_RANGE) for _ in range(NUMBER_COUNT)]
+  required_ops = [op for op in OPS if rng.choice([True, False])]
+  rng.shuffle(required_ops)
+  start = profile and time.perf_counter_ns()
+  for _ in range(100): # 100 retries
+    rng.shuffle(numbers)
+    st = profile and time.perf_counter_ns()
+    built = build_expression(numbers, required_ops[:], rng) # copy required_ops because list is mutable
+    if built is None:
+      if profile: profile.add('candidate/reject/' + profile.last, st)
+      continue
+    result, tree = built
+    if result.denominator == 1 and TARGET_RANGE[0] <= result <= TARGET_RANGE[1]:
+      if profile: profile.add('candidate/accept', st); profile.add('generate_puzzle', start)
+      return numbers, int(result), tree
+    if profile: profile.add(f"candidate/reject/{'not_integer' if result.denominator != 1 else 'out_of_range'}/{tree[0]}", st)
+  if profile: profile.add('generate_puzzle/exhausted', start)
+  return None
+
+def puzzle_at(seed:int, index:int) -> tuple[list[int], int, int|tuple]:
+  """The puzzle with ID (seed, index), see seeds.py."""
+  return seeds.at(generate_puzzle, seed, index)
 
 if __name__ == '__main__':
+  # usage: ./twentyfour.py [puzzle id], puzzles then carry on from that one
+  import atexit, itertools
+  from sandbox import Sandbox
+  sandbox = Sandbox(SANDBOX_WORKERS, SANDBOX_TIMEOUT, SANDBOX_MEMORY_MB)
+  atexit.register(sandbox.close)
+  seed, start = seeds.parse_id(sys.argv[1]) if len(sys.argv) > 1 else (seeds.root_seed(), 0)
+  if os.getenv('BANK'):
+    from puzzle_bank import Bank
+    bank = Bank(os.getenv('BANK'))
+    if NUMBER_COUNT not in bank.counts: sys.exit(f"{os.getenv('BANK')} has no {NUMBER_COUNT}-number puzzles")
+    next_puzzle = lambda: (None, bank.sample(NUMBER_COUNT))
+  else: # generate the next puzzles in the background while the player is typing
+    from prefetch import Prefetcher
+    indices = itertools.count(start) # only the prefetch thread advances it
+    prefetcher = Prefetcher(lambda: (i := next(indices), puzzle_at(seed, i)), PREFETCH_DEPTH, PREFETCH_REFILL)
+    atexit.register(prefetcher.close)
+    next_puzzle = prefetcher.get
+
+  def sandboxed_check(tree, target):
+    st = profile and time.perf_counter_ns()
+    evaluated_input, correct, *timings = sandbox.call(check_answer, tree, target, bool(profile))
+    if profile:
+      profile.add('check_answer', st) # includes the round trip to the sandbox
+      for stage, ns in timings[0].items(): profile.add_ns(f'check_answer/{stage}', ns)
+    return evaluated_input, correct
+
   while True:
-    numbers = [random.randint(*NUMBER_RANGE) for _ in range(NUMBER_COUNT)]
-    required_ops = [op for op in OPS if random.choice([True, False])]
-    random.shuffle(required_ops)
-    target = None
-    for _ in range(100): # 100 retries
-      random.shuffle(numbers)
-      solution = generate_expression(numbers, required_ops[:]) # copy required_ops because list is mutable
-      if solution == None: continue
-      try:
-        with Timeout():
-          result = parse_expr(solution).simplify()
-          if result.is_integer and TARGET_RANGE[0] <= result <= TARGET_RANGE[1]:
-            target = int(result)
-            break
-      except: continue
-    if target is None: continue
+    st = profile and time.perf_counter_ns()
+    try: index, puzzle = next_puzzle()
+    except KeyboardInterrupt: print(); sys.exit() # Ctrl+C while a puzzle is still being generated
+    if profile: profile.add('wait_for_puzzle', st)
+    numbers, target, tree = puzzle
+    solution = render(tree)
 
     numbers.sort()
+    if index is not None: print(f'Puzzle {seeds.format_id(seed, index)}')
     print(numbers)
     print(f'Target: {target}')
-    user_input = input('Expression: ')
+    try: user_input = input('Expression: ')
+    except (KeyboardInterrupt, EOFError): print(); sys.exit() # atexit stops the prefetcher
     if user_input == 'q': print(f'Solution: {ast.unparse(ast.parse(solution))}'); sys.exit() # parse then unparse to remove redundant parentheses
     try:
-      user_numbers = sorted([int(s) for s in re.split(r'\D+', user_input) if s])
-      evaluated_input = parse_expr(user_input)
-      if user_numbers != numbers: print(f'Wrong numbers. Used {user_numbers}, needed {numbers}'); continue
-      with Timeout(): diff = (evaluated_input - target).simplify()
-      if diff == 0: print('Correct!'); break
-      print(f'Incorrect (got {evaluated_input}, want {target})')
+      correct, message = judge(user_input, numbers, target, sandboxed_check)
+      print(message)
+      if correct: break
     except Exception as e: print(f'Error: {e}')
\ No newline at end of file
@@ -1,41 +1,54 @@
 #!/usr/bin/env python3
 
-import random, readline, threading
+import os, random
+import seeds
+from session import Session
+from telemetry import Telemetry
 
 DURATION = 120
 
-def make_pow():
+def make_pow(rng=random):
   while True:
-    a, b = random.randint(2, 20), random.randint(2, 10)
+    a, b = rng.randint(2, 20), rng.randint(2, 10)
     if a ** b <= 1e9: return a, b
 
 OPS = {
-  '+':  lambda: (random.randint(2,1000), random.randint(2,1000)),
-  '-':  lambda: (random.randint(2,1000), random.randint(2,1000)),
-  '*':  lambda: (random.randint(2,100), random.randint(2,20)),
-  '/':  lambda: (random.randint(2,2000), random.randint(2,20)),
+  '+':  lambda rng=random: (rng.randint(2,1000), rng.randint(2,1000)),
+  '-':  lambda rng=random: (rng.randint(2,1000), rng.randint(2,1000)),
+  '*':  lambda rng=random: (rng.randint(2,100), rng.randint(2,20)),
+  '/':  lambda rng=random: (rng.randint(2,2000), rng.randint(2,20)),
   '**': make_pow,
 }
 
+def new_question(rng=random):
+  op = rng.choice(list(OPS))
+  a, b = OPS[op](rng)
+  return op, f'{a} {op} {b} = ', eval(f'{a} {op} {b}')
+
+def check(line, exact):
+  """Whether the answer in line is exact, None if it isn't a number."""
+  parse = float if isinstance(exact, float) else int
+  try: return parse(line) == exact
+  except ValueError: return None
+
 if __name__ == '__main__':
-  score = 0
-  running = threading.Event()
-  running.set()
-  timer = threading.Timer(DURATION, running.clear)
-  timer.start()
+  score, rng = 0, seeds.from_env() # SEED=<seed> replays a session's questions
+  telemetry = Telemetry('zetamac', os.getenv('TELEMETRY')) # TELEMETRY=<path> appends every question to a log
+  session = Session(DURATION) # ends the session mid-question, exactly DURATION seconds in
   try:
-    while running.is_set():
-      op = random.choice(list(OPS))
-      a, b = OPS[op]()
-      exact = eval(f'{a} {op} {b}')
-      parse = float if isinstance(exact, float) else int
+    while True:
+      op, prompt, exact = new_question(rng)
+      telemetry.ask()
       while True:
-        try: ans = parse(input(f'{a} {op} {b} = '))
-        except ValueError: continue
-        if ans == exact:
-          if isinstance(exact, float): print(f'Exact: {round(exact, 2)} ({round((ans - exact) / exact * 100, 2)}% error)')
+        correct = check(session.input(prompt), exact)
+        if correct:
+          if isinstance(exact, float): print(f'Exact: {round(exact, 2)} (0.0% error)')
           break
+        if correct is False: telemetry.miss()
+      telemetry.answer(op)
       score += 1
       print(f'Score: {score}')
-  except (KeyboardInterrupt, EOFError): timer.cancel()
-  print(f'\nAnswer: {exact}')
\ No newline at end of file
+  except (KeyboardInterrupt, EOFError, TimeoutError): telemetry.answer(op, answered=False)
+  session.close()
+  print(f'\nAnswer: {exact}')
+  telemetry.close()
\ No newline at end of file